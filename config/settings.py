@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -27,8 +27,50 @@ class Settings(BaseSettings):
     REDIS_DB: int
     REDIS_PASSWORD: Optional[str] = None
     REDIS_EXPIRE_SECONDS: int
+    FILE_ID_EXPIRE_SECONDS: int = 30 * 24 * 3600
+    PHOTO_LOCAL_CACHE_BYTES: int = 64 * 1024 * 1024
+    PROFILE_CARD_TTL_SECONDS: int = 7 * 24 * 3600
+    PROFILE_CARD_LOCAL_SIZE: int = 10_000
+    PROFILE_CARD_LOCAL_TTL_SECONDS: float = 3600.0
+    PREFERENCES_LOCAL_SIZE: int = 10_000
+    PREFERENCES_LOCAL_TTL_SECONDS: float = 3600.0
+    USER_ID_CACHE_SIZE: int = 100_000
 
-    USER_QUEUE: str = 'user_queue.{user_id}'
+    S3_MAX_CONNECTIONS: int = 20
+    S3_MAX_CONCURRENCY: int = 16
+    S3_TIMEOUT: float = 30.0
+
+    IMAGE_WORKERS: int = 2
+    PHOTO_DISPLAY_SIZE: int = 1280
+    PHOTO_DISPLAY_QUALITY: int = 85
+    PHOTO_GC_INTERVAL: float = 3600.0
+    PHOTO_GC_GRACE_SECONDS: int = 24 * 3600
+    PHOTO_GC_BATCH_SIZE: int = 500
+
+    RPC_TIMEOUT: float = 30.0
+
+    TELEGRAM_GLOBAL_RATE: float = 30.0
+    TELEGRAM_CHAT_INTERVAL: float = 1.0
+    TELEGRAM_CHAT_BURST: int = 3
+    TELEGRAM_MAX_RETRIES: int = 3
+
+    CONSUMER_SHARDS: int = 4
+    CONSUMER_LANES: Dict[str, int] = {'interactive': 16, 'write': 4, 'media': 2}
+    CONSUMER_PREFETCH_COUNT: Dict[str, int] = {'interactive': 64, 'write': 16, 'media': 2}
+    CONSUMER_BACKLOG_LOG_INTERVAL: float = 30.0
+
+    FEED_BATCH_SIZE: int = 50
+    FEED_REFILL_THRESHOLD: int = 10
+    FEED_TTL_SECONDS: int = 3600
+    PHOTO_PREFETCH_COUNT: int = 3
+
+    SWIPE_WRITE_BEHIND: bool = False
+    SWIPE_FLUSH_BATCH_SIZE: int = 500
+    SWIPE_FLUSH_INTERVAL: float = 1.0
+
+    RATING_SHARDS: int = 8
+    RATING_FOLD_INTERVAL: float = 5.0
+    RATING_FOLD_BATCH_SIZE: int = 1000
 
     @property
     def db_url(self) -> str:
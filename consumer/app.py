@@ -1,40 +1,77 @@
 import asyncio
-import msgpack
 import logging
+from typing import List, Optional, Sequence
 from aio_pika import connect_robust
+from aio_pika.abc import AbstractRobustConnection
 from consumer.handlers.event_distribution import event_distribution
+from consumer.handlers.swipe_buffer import run_swipe_flusher
+from consumer.handlers.rating import run_rating_aggregator
+from consumer.handlers.photo_gc import run_photo_gc
+from consumer.worker_pool import WorkerPool
 from config.settings import settings
+from src.storage.rabbit import topology, ACTION_CLASSES, USER_MESSAGES_QUEUE
+from src.storage.s3_yandex import s3_storage
 
 logger = logging.getLogger(__name__)
 
-async def main():
-    logger.info("Запуск RabbitMQ consumer")
+async def start_action_class(connection: AbstractRobustConnection, action_class: str, shards: Sequence[int]) -> WorkerPool:
+    pool = WorkerPool(action_class, event_distribution, settings.CONSUMER_LANES[action_class])
+    pool.start()
+
+    channel = await connection.channel()
+    await channel.set_qos(prefetch_count=settings.CONSUMER_PREFETCH_COUNT[action_class])
+    for shard in shards:
+        queue_name = USER_MESSAGES_QUEUE.format(action_class=action_class, shard=shard)
+        queue = await channel.declare_queue(queue_name, durable=True)
+        await queue.consume(pool.submit)
+    logger.info(f"Очереди класса '{action_class}' подключены")
+    return pool
+
+async def main(shards: Optional[Sequence[int]] = None):
+    if shards is None:
+        shards = range(settings.CONSUMER_SHARDS)
+
+    logger.info(f"Запуск RabbitMQ consumer для шардов {list(shards)}")
+    pools: List[WorkerPool] = []
+    backlog_tasks: List[asyncio.Task] = []
     try:
         logger.info(f"Подключение к RabbitMQ по URL: {settings.rebbitmq_url}")
         connection = await connect_robust(settings.rebbitmq_url)
         channel = await connection.channel()
         
-        logger.info("Объявление очереди 'user_messages'")
-        queue = await channel.declare_queue('user_messages', durable=True)
+        logger.info("Объявление топологии RabbitMQ")
+        await topology.declare(channel)
+
+        logger.info("Подключение к хранилищу S3")
+        await s3_storage.start()
         
         logger.info("Начало обработки сообщений")
-        async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
-                    try:
-                        logger.debug(f"Получено новое сообщение: {message.body[:100]}...")
-                        body = msgpack.unpackb(message.body)
-                        logger.debug(f"Распакованное сообщение: {body}")
-                        
-                        await event_distribution(body)
-                        logger.debug("Сообщение успешно обработано")
-                        
-                    except Exception as e:
-                        logger.error(f"Ошибка обработки сообщения: {str(e)}", exc_info=True)
-                        
+        for action_class in sorted(set(ACTION_CLASSES.values())):
+            pool = await start_action_class(connection, action_class, shards)
+            pools.append(pool)
+            backlog_tasks.append(asyncio.create_task(pool.report_backlog(settings.CONSUMER_BACKLOG_LOG_INTERVAL)))
+
+        if settings.SWIPE_WRITE_BEHIND:
+            logger.info("Включен режим отложенной записи свайпов")
+            for shard in shards:
+                backlog_tasks.append(asyncio.create_task(run_swipe_flusher(shard)))
+
+        # одного агрегатора рейтинга и сборщика фото достаточно, их запускает процесс с шардом 0
+        if 0 in shards:
+            backlog_tasks.append(asyncio.create_task(run_rating_aggregator()))
+            backlog_tasks.append(asyncio.create_task(run_photo_gc()))
+
+        await asyncio.Future()
+
     except Exception as e:
         logger.critical(f"Критическая ошибка в работе consumer: {str(e)}", exc_info=True)
         raise
+    finally:
+        for task in backlog_tasks:
+            task.cancel()
+        for pool in pools:
+            await pool.stop()
+        await s3_storage.close()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,114 @@
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import delete, insert, or_, select
+
+from config.settings import settings
+from consumer.handlers.likes import _commit_vote
+from consumer.handlers.rating import fold_rating_shards
+from consumer.storage.db import async_session, engine
+from src.model.models import Like, Match, User, UserRatingShard
+
+logger = logging.getLogger(__name__)
+
+# far above real Telegram ids, so the benchmark never touches real users
+BENCH_TG_ID_BASE = 9_000_000_000_000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Contention benchmark for likes on a single hot profile")
+    parser.add_argument('--voters', type=int, default=500, help="Number of users liking the hot profile")
+    parser.add_argument('--concurrency', type=int, default=16, help="Votes in flight at the same time")
+    parser.add_argument(
+        '--rating-shards',
+        type=int,
+        nargs='+',
+        default=[1, settings.RATING_SHARDS],
+        help="RATING_SHARDS values to compare, 1 behaves like a single counter row"
+    )
+    return parser.parse_args()
+
+
+def _bench_user(tg_id: int) -> dict:
+    return {
+        'tg_id': tg_id,
+        'tg_username': None,
+        'firstname': 'Bench',
+        'lastname': 'Bench',
+        'mname': 'Bench',
+        'age': 30,
+        'gender': 'Женский',
+        'bio': 'rating contention benchmark'
+    }
+
+
+async def _cleanup():
+    bench_users = select(User.id).where(User.tg_id >= BENCH_TG_ID_BASE)
+    async with async_session() as session:
+        await session.execute(delete(UserRatingShard).where(UserRatingShard.user_id.in_(bench_users)))
+        await session.execute(delete(Match).where(or_(Match.user1_id.in_(bench_users), Match.user2_id.in_(bench_users))))
+        await session.execute(delete(Like).where(or_(Like.from_user_id.in_(bench_users), Like.to_user_id.in_(bench_users))))
+        await session.execute(delete(User).where(User.tg_id >= BENCH_TG_ID_BASE))
+        await session.commit()
+
+
+async def _setup(voters: int) -> int:
+    async with async_session() as session:
+        await session.execute(
+            insert(User),
+            [_bench_user(BENCH_TG_ID_BASE + index) for index in range(voters + 1)]
+        )
+        await session.commit()
+        result = await session.execute(select(User.id).where(User.tg_id == BENCH_TG_ID_BASE))
+        return result.scalar_one()
+
+
+async def run_round(voters: int, concurrency: int, rating_shards: int):
+    await _cleanup()
+    target_id = await _setup(voters)
+    settings.RATING_SHARDS = rating_shards
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def vote(tg_id: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await _commit_vote(tg_id, target_id, True)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(vote(BENCH_TG_ID_BASE + index) for index in range(1, voters + 1)))
+    elapsed = time.perf_counter() - started
+
+    await fold_rating_shards()
+    async with async_session() as session:
+        like_count = (await session.execute(select(User.like_count).where(User.id == target_id))).scalar_one()
+
+    latencies.sort()
+    logger.info(
+        f"rating_shards={rating_shards}: {voters} votes in {elapsed:.2f}s "
+        f"({voters / elapsed:.0f} votes/s), p50={statistics.median(latencies) * 1000:.1f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f}ms, like_count={like_count}"
+    )
+    if like_count != voters:
+        logger.error(f"Expected like_count={voters} after folding, got {like_count}")
+
+
+async def main():
+    args = parse_args()
+    try:
+        for rating_shards in args.rating_shards:
+            await run_round(args.voters, args.concurrency, rating_shards)
+    finally:
+        await _cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+import uuid
+from typing import Awaitable, Callable, List
+
+import aioboto3
+import aiohttp
+from botocore.exceptions import ClientError
+
+from config.settings import settings
+from src.storage.s3_yandex import s3_storage
+
+logger = logging.getLogger(__name__)
+
+BENCH_PREFIX = 'benchmarks/'
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Photo upload and fetch latency with per-call clients versus the shared S3Storage. "
+                    "Point ENDPOINT_URL at a local S3 stand-in, e.g. `moto_server -p 5000` or MinIO."
+    )
+    parser.add_argument('--requests', type=int, default=100, help="Uploads and fetches per mode")
+    parser.add_argument('--size', type=int, default=150_000, help="Photo size in bytes")
+    parser.add_argument('--concurrency', type=int, default=8, help="Requests in flight at the same time")
+    return parser.parse_args()
+
+
+def _client(session: aioboto3.Session):
+    return session.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.REGION_NAME,
+        endpoint_url=settings.ENDPOINT_URL,
+    )
+
+
+async def upload_per_call(object_key: str, body: bytes) -> str:
+    async with _client(aioboto3.Session()) as s3:
+        await s3.put_object(Bucket=settings.BUCKET_NAME, Key=object_key, Body=body)
+    return f"{settings.ENDPOINT_URL}/{settings.BUCKET_NAME}/{object_key}"
+
+
+async def fetch_per_call(url: str) -> bytes:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as resp:
+            return await resp.read()
+
+
+async def _ensure_bucket():
+    async with _client(aioboto3.Session()) as s3:
+        try:
+            await s3.head_bucket(Bucket=settings.BUCKET_NAME)
+        except ClientError:
+            logger.info(f"Creating public-read bucket {settings.BUCKET_NAME}")
+            await s3.create_bucket(Bucket=settings.BUCKET_NAME)
+            await s3.put_bucket_policy(Bucket=settings.BUCKET_NAME, Policy=json.dumps({
+                'Version': '2012-10-17',
+                'Statement': [{
+                    'Effect': 'Allow',
+                    'Principal': '*',
+                    'Action': 's3:GetObject',
+                    'Resource': f"arn:aws:s3:::{settings.BUCKET_NAME}/*"
+                }]
+            }))
+
+
+async def _cleanup():
+    async with _client(aioboto3.Session()) as s3:
+        paginator = s3.get_paginator('list_objects_v2')
+        async for page in paginator.paginate(Bucket=settings.BUCKET_NAME, Prefix=BENCH_PREFIX):
+            keys = [{'Key': item['Key']} for item in page.get('Contents', [])]
+            if keys:
+                await s3.delete_objects(Bucket=settings.BUCKET_NAME, Delete={'Objects': keys})
+
+
+async def _timed(calls: List[Callable[[], Awaitable]], concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def run(call: Callable[[], Awaitable]):
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(run(call) for call in calls))
+    return sorted(latencies)
+
+
+def _report(mode: str, operation: str, latencies: List[float]):
+    logger.info(
+        f"{mode:>8} {operation:<6} mean={statistics.mean(latencies) * 1000:7.1f}ms "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f}ms"
+    )
+
+
+async def run_mode(mode: str, upload, fetch, args: argparse.Namespace):
+    body = os.urandom(args.size)
+    keys = [f"{BENCH_PREFIX}{mode}/{uuid.uuid4()}.jpg" for _ in range(args.requests)]
+    urls: List[str] = []
+
+    async def upload_one(key: str):
+        urls.append(await upload(key, body))
+
+    _report(mode, 'upload', await _timed([lambda key=key: upload_one(key) for key in keys], args.concurrency))
+    _report(mode, 'fetch', await _timed([lambda url=url: fetch(url) for url in urls], args.concurrency))
+
+
+async def main():
+    args = parse_args()
+    await _ensure_bucket()
+    try:
+        await run_mode('per-call', upload_per_call, fetch_per_call, args)
+        await s3_storage.start()
+        await run_mode('shared', s3_storage.put_object, s3_storage.fetch, args)
+    finally:
+        await s3_storage.close()
+        await _cleanup()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger('src.storage').setLevel(logging.WARNING)
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, List
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY_SECONDS = 1.0
+
+
+def assign_shards(workers: int) -> List[List[int]]:
+    return [list(range(worker, settings.CONSUMER_SHARDS, workers)) for worker in range(workers)]
+
+
+def run_worker(shards: List[int]):
+    from consumer.app import main
+
+    try:
+        asyncio.run(main(shards))
+    except KeyboardInterrupt:
+        pass
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Запуск нескольких процессов consumer")
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=min(os.cpu_count() or 1, settings.CONSUMER_SHARDS),
+        help="Количество процессов consumer (не больше CONSUMER_SHARDS)"
+    )
+    return parser.parse_args()
+
+
+def supervise(workers: int):
+    if workers < 1 or workers > settings.CONSUMER_SHARDS:
+        raise ValueError(f"workers must be between 1 and CONSUMER_SHARDS={settings.CONSUMER_SHARDS}")
+
+    context = multiprocessing.get_context('spawn')
+    assignments = assign_shards(workers)
+    if settings.CONSUMER_SHARDS % workers:
+        logger.warning(
+            f"CONSUMER_SHARDS={settings.CONSUMER_SHARDS} не делится на {workers} процессов, нагрузка распределена "
+            f"неравномерно: шардов на процесс {[len(shards) for shards in assignments]}"
+        )
+    processes: Dict[int, multiprocessing.Process] = {}
+    stopping = False
+
+    def start(index: int):
+        process = context.Process(target=run_worker, args=(assignments[index],), name=f"consumer-{index}")
+        process.start()
+        processes[index] = process
+        logger.info(f"Процесс {process.name} (pid {process.pid}) обслуживает шарды {assignments[index]}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        logger.info(f"Получен сигнал {signum}, остановка процессов consumer")
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for index in range(workers):
+        start(index)
+
+    while not stopping:
+        time.sleep(RESTART_DELAY_SECONDS)
+        for index, process in list(processes.items()):
+            if not process.is_alive() and not stopping:
+                logger.warning(f"Процесс {process.name} завершился с кодом {process.exitcode}, перезапуск")
+                start(index)
+
+    for process in processes.values():
+        if process.is_alive():
+            process.terminate()
+    for process in processes.values():
+        process.join()
+    logger.info("Все процессы consumer остановлены")
+
+
+if __name__ == "__main__":
+    supervise(parse_args().workers)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import random
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import Select, select, exists
+from consumer.storage.db import async_session
+from consumer.storage.redis import redis_client
+from src.model.models import User, Like, Preference
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# feeds hold candidate tg_ids, so the next profile is served from the profile card cache
+FEED_KEY = 'feed_tg_ids:{user_id}'
+FEED_GENERATION_KEY = 'feed_generation:{user_id}'
+
+# a build started before invalidate_feed must not push candidates picked with the old preferences
+PUSH_FEED_SCRIPT = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then
+    return -1
+end
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+_push_feed = redis_client.register_script(PUSH_FEED_SCRIPT)
+
+# one build per viewer at a time, inline builds and background refills share it
+_refills: Dict[int, asyncio.Task] = {}
+
+
+def candidate_query(user_id: int, prefs: Optional[Preference], queued_tg_ids: Iterable[int] = ()) -> Select:
+    already_rated = exists().where(
+        Like.from_user_id == user_id,
+        Like.to_user_id == User.id
+    )
+    query = select(User.tg_id).where(
+        User.id != user_id,
+        User.tg_id.not_in(set(queued_tg_ids)),
+        ~already_rated,
+        User.photo != None
+    )
+
+    if prefs:
+        if prefs.preferred_gender and prefs.preferred_gender != "Любой":
+            query = query.where(User.gender == prefs.preferred_gender)
+        if prefs.min_age is not None:
+            query = query.where(User.age >= prefs.min_age)
+        if prefs.max_age is not None:
+            query = query.where(User.age <= prefs.max_age)
+        if prefs.min_rating is not None:
+            query = query.where(User.rating >= prefs.min_rating)
+        if prefs.max_rating is not None:
+            query = query.where(User.rating <= prefs.max_rating)
+
+    return query
+
+
+async def build_feed(user_id: int) -> int:
+    key = FEED_KEY.format(user_id=user_id)
+    logger.debug(f"Building candidate feed for user {user_id}")
+
+    generation_key = FEED_GENERATION_KEY.format(user_id=user_id)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.get(generation_key)
+        pipe.lrange(key, 0, -1)
+        generation, queued = await pipe.execute()
+    generation = (generation or b'0').decode()
+    queued_tg_ids = {int(tg_id) for tg_id in queued}
+
+    async with async_session() as session:
+        pref_result = await session.execute(
+            select(Preference).where(Preference.user_id == user_id)
+        )
+        prefs = pref_result.scalar_one_or_none()
+
+        query = candidate_query(user_id, prefs, queued_tg_ids)
+        start = random.random()
+        result = await session.execute(
+            query.where(User.random_key >= start)
+            .order_by(User.random_key)
+            .limit(settings.FEED_BATCH_SIZE)
+        )
+        candidate_tg_ids = list(result.scalars().all())
+
+        if len(candidate_tg_ids) < settings.FEED_BATCH_SIZE:
+            result = await session.execute(
+                query.where(User.random_key < start)
+                .order_by(User.random_key)
+                .limit(settings.FEED_BATCH_SIZE - len(candidate_tg_ids))
+            )
+            candidate_tg_ids.extend(result.scalars().all())
+
+    if candidate_tg_ids:
+        pushed = await _push_feed(
+            keys=[key, generation_key],
+            args=[generation, settings.FEED_TTL_SECONDS, *candidate_tg_ids]
+        )
+        if pushed < 0:
+            logger.debug(f"Feed of user {user_id} was invalidated during the build, candidates dropped")
+            return 0
+
+    logger.debug(f"Added {len(candidate_tg_ids)} candidates to feed of user {user_id}")
+    return len(candidate_tg_ids)
+
+
+async def _refill(user_id: int) -> int:
+    try:
+        return await build_feed(user_id)
+    except Exception as e:
+        logger.error(f"Failed to refill feed for user {user_id}: {str(e)}", exc_info=True)
+        return 0
+    finally:
+        _refills.pop(user_id, None)
+
+
+def schedule_refill(user_id: int) -> asyncio.Task:
+    task = _refills.get(user_id)
+    if task is None:
+        task = asyncio.create_task(_refill(user_id))
+        _refills[user_id] = task
+    return task
+
+
+async def pop_candidate(user_id: int) -> Optional[int]:
+    key = FEED_KEY.format(user_id=user_id)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.lpop(key)
+        pipe.llen(key)
+        candidate_tg_id, remaining = await pipe.execute()
+
+    if candidate_tg_id is None:
+        logger.debug(f"Feed of user {user_id} is empty, building synchronously")
+        if not await asyncio.shield(schedule_refill(user_id)):
+            return None
+        candidate_tg_id = await redis_client.lpop(key)
+    elif remaining < settings.FEED_REFILL_THRESHOLD:
+        schedule_refill(user_id)
+
+    return int(candidate_tg_id) if candidate_tg_id is not None else None
+
+
+async def peek_candidates(user_id: int, count: int) -> List[int]:
+    candidate_tg_ids = await redis_client.lrange(FEED_KEY.format(user_id=user_id), 0, count - 1)
+    return [int(candidate_tg_id) for candidate_tg_id in candidate_tg_ids]
+
+
+async def invalidate_feed(user_id: int):
+    logger.debug(f"Invalidating candidate feed for user {user_id}")
+    generation_key = FEED_GENERATION_KEY.format(user_id=user_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(FEED_KEY.format(user_id=user_id))
+        pipe.incr(generation_key)
+        pipe.expire(generation_key, settings.FEED_TTL_SECONDS)
+        await pipe.execute()
@@ -1,13 +1,14 @@
-import msgpack
-from sqlalchemy import select, delete, update, func
+from sqlalchemy import Select, and_, case, exists, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
 from datetime import datetime
 from typing import Optional
 import logging
 from consumer.storage.db import async_session
-from src.model.models import User, Like
-from consumer.storage.rabbit import channel_pool
-import aio_pika
-from aio_pika import ExchangeType
+from src.model.models import User, Like, Match, UserRatingShard
+from consumer.storage.rabbit import publish_reply
+from consumer.handlers.rating import add_rating_deltas
+from consumer.handlers.swipe_buffer import buffer_vote
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -27,58 +28,18 @@ async def process_like(body: dict):
     }
     
     try:
-        async with async_session() as session:
-            logger.debug(f"Fetching from_user info for tg_id: {from_user_tg_id}")
-            from_user_result = await session.execute(select(User).where(User.tg_id == from_user_tg_id))
-            from_user = from_user_result.scalar_one()
-            from_user_id = from_user.id
-
-            logger.debug(f"Deleting existing likes between users {from_user_id} and {to_user_id}")
-            await session.execute(
-                delete(Like)
-                .where(
-                    Like.from_user_id == from_user_id,
-                    Like.to_user_id == to_user_id
-                )
-            )
-
-            logger.debug(f"Creating new {'like' if is_like else 'dislike'} record")
-            like = Like(
-                from_user_id=from_user_id,
-                to_user_id=to_user_id,
-                is_like=is_like,
-                liked_at=datetime.utcnow()
-            )
-            session.add(like)
+        if settings.SWIPE_WRITE_BEHIND:
+            match = await buffer_vote(from_user_tg_id, to_user_id, is_like)
+        else:
+            match = await _commit_vote(from_user_tg_id, to_user_id, is_like)
+
+        if is_like and match:
+            logger.info(f"Match found between user {from_user_tg_id} and user {to_user_id}")
+            response['match'] = True
+            response.update(match)
             
-            await session.commit()
-            logger.debug("Like record successfully committed")
-
-            if is_like:
-                logger.debug("Processing like - updating rating and checking for match")
-                await _update_user_rating(session, to_user_id)
-                matched_user = await _check_match(session, from_user_id, to_user_id)
-                if matched_user:
-                    logger.info(f"Match found between users {from_user_id} and {to_user_id}")
-                    response['match'] = True
-                    response['matched_user'] = {
-                        'tg_id': matched_user.tg_id,
-                        'tg_username': matched_user.tg_username,
-                        'firstname': matched_user.firstname,
-                        'lastname': matched_user.lastname
-                    }
-                    response['from_user_data'] = {
-                        'tg_id': from_user.tg_id,
-                        'tg_username': from_user.tg_username,
-                        'firstname': from_user.firstname,
-                        'lastname': from_user.lastname
-                    }
-            else:
-                logger.debug("Processing dislike - updating rating")
-                await _update_user_rating(session, to_user_id)
-            
-            response['status'] = 'success'
-            logger.info(f"Successfully processed {'like' if is_like else 'dislike'}")
+        response['status'] = 'success'
+        logger.info(f"Successfully processed {'like' if is_like else 'dislike'}")
             
     except Exception as e:
         logger.error(f"Error processing like: {str(e)}", exc_info=True)
@@ -88,92 +49,147 @@ async def process_like(body: dict):
         })
 
     try:
-        await _publish_response(response)
+        await _publish_response(body, response)
         logger.debug("Successfully published response")
     except Exception as e:
         logger.error(f"Failed to publish response: {str(e)}", exc_info=True)
         raise
 
 
-async def _update_user_rating(session, user_id: int):
-    logger.debug(f"Updating rating for user {user_id}")
-
-    likes = await session.execute(
-        select(func.count()).where(
-            Like.to_user_id == user_id,
-            Like.is_like == True
+async def _commit_vote(from_user_tg_id: int, to_user_id: int, is_like: bool) -> Optional[dict]:
+    async with async_session() as session:
+        # crossing votes of one pair run one after another, the vote statement takes its snapshot after the lock,
+        # so of two concurrent likes A->B and B->A the second always sees the first and writes the match
+        await session.execute(_pair_lock_statement(from_user_tg_id, to_user_id))
+        logger.debug(f"Upserting {'like' if is_like else 'dislike'} from tg_id {from_user_tg_id} to user {to_user_id}")
+        result = await session.execute(_vote_statement(from_user_tg_id, to_user_id, is_like))
+        vote = result.one()
+        await session.commit()
+        logger.debug(
+            f"Vote committed for user {vote.from_user_id} -> {to_user_id}, previous vote: {vote.previous_is_like}"
         )
+
+    if not vote.is_match:
+        return None
+    return {
+        'matched_user': {
+            'tg_id': vote.to_tg_id,
+            'tg_username': vote.to_tg_username,
+            'firstname': vote.to_firstname,
+            'lastname': vote.to_lastname
+        },
+        'from_user_data': {
+            'tg_id': vote.from_tg_id,
+            'tg_username': vote.from_tg_username,
+            'firstname': vote.from_firstname,
+            'lastname': vote.from_lastname
+        }
+    }
+
+
+def _pair_lock_statement(from_user_tg_id: int, to_user_id: int) -> Select:
+    sender_id = select(User.id).where(User.tg_id == from_user_tg_id).scalar_subquery()
+    return select(func.pg_advisory_xact_lock(func.least(sender_id, to_user_id), func.greatest(sender_id, to_user_id)))
+
+
+def _vote_statement(from_user_tg_id: int, to_user_id: int, is_like: bool) -> Select:
+    sender = (
+        select(User.id, User.tg_id, User.tg_username, User.firstname, User.lastname)
+        .where(User.tg_id == from_user_tg_id)
+        .cte('sender')
     )
-    like_count = likes.scalar() or 0
-    logger.debug(f"User {user_id} has {like_count} likes")
 
-    dislikes = await session.execute(
-        select(func.count()).where(
-            Like.to_user_id == user_id,
-            Like.is_like == False
-        )
+    # every CTE reads the snapshot taken before the statement, so this is the vote being replaced
+    previous = (
+        select(sender.c.id, Like.is_like)
+        .select_from(sender)
+        .outerjoin(Like, and_(Like.from_user_id == sender.c.id, Like.to_user_id == to_user_id))
+        .cte('previous')
     )
-    dislike_count = dislikes.scalar() or 0
-    logger.debug(f"User {user_id} has {dislike_count} dislikes")
 
-    base_rating = 2.5
-    like_weight = 0.1
-    dislike_weight = 0.15
-    
-    new_rating = base_rating + (like_count * like_weight) - (dislike_count * dislike_weight)
-    new_rating = max(0.0, min(5.0, new_rating))
-    logger.debug(f"New rating for user {user_id}: {new_rating:.2f}")
-
-    await session.execute(
-        update(User)
-        .where(User.id == user_id)
-        .values(
-            rating=new_rating,
-            like_count=like_count,
-            dislike_count=dislike_count
+    insert_like = insert(Like).from_select(
+        ['from_user_id', 'to_user_id', 'is_like', 'liked_at'],
+        select(sender.c.id, literal(to_user_id), literal(is_like), literal(datetime.utcnow()))
+    )
+    upsert = (
+        insert_like
+        .on_conflict_do_update(
+            index_elements=[Like.from_user_id, Like.to_user_id],
+            set_={'is_like': insert_like.excluded.is_like, 'liked_at': insert_like.excluded.liked_at}
         )
+        .returning(Like.from_user_id)
+        .cte('upsert')
     )
 
+    reverse_like = exists().where(
+        Like.from_user_id == to_user_id,
+        Like.to_user_id == sender.c.id,
+        Like.is_like == True
+    )
 
-async def _check_match(session, user1_id: int, user2_id: int) -> Optional[int]:
-    logger.debug(f"Checking for match between users {user1_id} and {user2_id}")
-    
-    mutual_like = await session.execute(
-        select(Like)
-        .where(
-            Like.from_user_id == user2_id,
-            Like.to_user_id == user1_id,
-            Like.is_like == True
+    previous_is_like = select(previous.c.is_like).scalar_subquery()
+    vote_delta = (
+        select(
+            literal(to_user_id).label('user_id'),
+            (int(is_like) - case((previous_is_like == True, 1), else_=0)).label('likes'),
+            (int(not is_like) - case((previous_is_like == False, 1), else_=0)).label('dislikes')
         )
+        .where(exists(select(upsert.c.from_user_id)))
+        .cte('vote_delta')
+    )
+    counters = add_rating_deltas(vote_delta).returning(UserRatingShard.user_id).cte('counters')
+
+    ctes = [upsert, counters]
+    if is_like:
+        # matches are stored once per pair with the smaller id first
+        ctes.append(
+            insert(Match)
+            .from_select(
+                ['user1_id', 'user2_id', 'matched_at'],
+                select(
+                    func.least(sender.c.id, to_user_id),
+                    func.greatest(sender.c.id, to_user_id),
+                    literal(datetime.utcnow())
+                )
+                .where(reverse_like)
+            )
+            .on_conflict_do_nothing(constraint='uq_matches_user1_user2')
+            .returning(Match.id)
+            .cte('new_match')
+        )
+
+    target = aliased(User)
+
+    return (
+        select(
+            sender.c.id.label('from_user_id'),
+            sender.c.tg_id.label('from_tg_id'),
+            sender.c.tg_username.label('from_tg_username'),
+            sender.c.firstname.label('from_firstname'),
+            sender.c.lastname.label('from_lastname'),
+            previous.c.is_like.label('previous_is_like'),
+            reverse_like.label('is_match'),
+            target.tg_id.label('to_tg_id'),
+            target.tg_username.label('to_tg_username'),
+            target.firstname.label('to_firstname'),
+            target.lastname.label('to_lastname')
+        )
+        .select_from(sender)
+        .join(previous, previous.c.id == sender.c.id)
+        .join(target, target.id == to_user_id)
+        .add_cte(*ctes)
     )
-    
-    if mutual_like.scalar():
-        logger.debug(f"Mutual like found between users {user1_id} and {user2_id}")
-        return await session.get(User, user2_id)
-    
-    logger.debug("No mutual like found")
-    return None
 
 
-async def _publish_response(response: dict):
+async def _publish_response(body: dict, response: dict):
     user_id = response['from_user_tg_id']
     logger.debug(f"Publishing response for user {user_id}")
     
-    async with channel_pool.acquire() as channel:
-        exchange = await channel.declare_exchange(
-            'likes_updates',
-            ExchangeType.TOPIC,
-            durable=True
-        )
-        
-        await exchange.publish(
-            aio_pika.Message(
-                body=msgpack.packb(response),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                headers={
-                    'user_id': str(user_id),
-                    'action': response['action']
-                }
-            ),
-            routing_key=settings.USER_QUEUE.format(user_id=user_id)
-        )
+    await publish_reply(
+        body,
+        response,
+        headers={
+            'user_id': str(user_id),
+            'action': response['action']
+        }
+    )
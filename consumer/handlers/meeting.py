@@ -1,137 +1,122 @@
-import msgpack
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 import logging
+from typing import Optional
 from consumer.storage.db import async_session
-from src.model.models import User, Like, Preference
-from consumer.storage.rabbit import channel_pool
-import aio_pika
-from aio_pika import ExchangeType
+from consumer.handlers.feed import peek_candidates, pop_candidate
 from config.settings import settings
+from src.storage.user_ids import user_id_cache
+from src.model.models import Like
+from src.storage.profile_cards import profile_card_cache
+from consumer.storage.rabbit import publish_reply
 
 logger = logging.getLogger(__name__)
 
-async def process_get_next_profile(body: dict):
-    current_tg_id = body.get('current_tg_id')
-    commented_but_not_rated = body.get('commented_but_not_rated')
-    
-    logger.info(f"Processing next profile request for user {current_tg_id}")
-    logger.debug(f"Commented but not rated: {commented_but_not_rated}")
+async def _next_profile_response(session: AsyncSession, current_tg_id: int, commented_but_not_rated: Optional[dict]) -> dict:
+    if commented_but_not_rated:
+        logger.info("Returning previously commented profile")
+        return {
+            'status': 'success',
+            'profile': commented_but_not_rated,
+            'user_tg_id': current_tg_id,
+            'action': 'next_profile'
+        }
 
-    async with async_session() as session:
-        try:
-            if commented_but_not_rated:
-                logger.info("Returning previously commented profile")
-                return commented_but_not_rated
+    current_user_id = await user_id_cache.resolve(session, current_tg_id)
+    if current_user_id is None:
+        logger.warning(f"User {current_tg_id} not found in database")
+        return {
+            'status': 'not_found',
+            'user_tg_id': current_tg_id,
+            'action': 'next_profile'
+        }
 
-            logger.debug("Fetching current user info")
-            user_result = await session.execute(
-                select(User).where(User.tg_id == current_tg_id))
-            current_user = user_result.scalar_one_or_none()
-            
-            if not current_user:
-                logger.warning(f"User {current_tg_id} not found in database")
-                return None
+    logger.debug("Popping next candidate from feed")
+    card = None
+    while card is None:
+        candidate_tg_id = await pop_candidate(current_user_id)
+        if candidate_tg_id is None:
+            break
 
-            logger.debug("Fetching interacted user IDs")
-            interacted = await session.execute(
-                select(Like.to_user_id).where(Like.from_user_id == current_user.id)
-            )
-            excluded_ids = {id for (id,) in interacted.all()} | {current_user.id}
-            logger.debug(f"Excluded user IDs: {excluded_ids}")
+        # the profile comes from the card cache, Postgres is only read for cards missing there
+        candidate = (await profile_card_cache.load_many(session, [candidate_tg_id])).get(candidate_tg_id)
+        if candidate is None or not candidate['photo']:
+            continue
 
-            logger.debug("Fetching user preferences")
-            pref_result = await session.execute(
-                select(Preference).where(Preference.user_id == current_user.id)
-            )
-            prefs = pref_result.scalar_one_or_none()
+        if await session.get(Like, (current_user_id, candidate['id'])):
+            logger.debug(f"Skipping already rated candidate {candidate['id']}")
+            continue
+        card = candidate
 
-            query = (
-                select(User)
-                .options(selectinload(User.photo))
-                .where(
-                    User.id.not_in(excluded_ids),
-                    User.photo != None
-                )
-            )
+    if not card:
+        logger.info("No matching profiles found")
+        return {
+            'status': 'empty',
+            'user_tg_id': current_tg_id,
+            'action': 'next_profile'
+        }
 
-            if prefs:
-                logger.debug("Applying preference filters")
-                if prefs.preferred_gender and prefs.preferred_gender != "Любой":
-                    logger.debug(f"Gender filter: {prefs.preferred_gender}")
-                    query = query.where(User.gender == prefs.preferred_gender)
-                
-                if prefs.min_age is not None:
-                    logger.debug(f"Min age filter: {prefs.min_age}")
-                    query = query.where(User.age >= prefs.min_age)
-                if prefs.max_age is not None:
-                    logger.debug(f"Max age filter: {prefs.max_age}")
-                    query = query.where(User.age <= prefs.max_age)
+    full_name = " ".join(filter(None, [card['lastname'], card['firstname'], card['mname']]))
+    profile_data = {
+        "id": card['id'],
+        "firstname": card['firstname'],
+        "lastname": card['lastname'],
+        "mname": card['mname'],
+        "full_name": full_name,
+        "photo": card['photo'],
+        "bio": card['bio'],
+        "age": card['age'],
+        "gender": card['gender'],
+        "rating": card['rating']
+    }
+    logger.info(f"Found matching profile: {card['id']}")
 
-                if prefs.min_rating is not None:
-                    logger.debug(f"Min rating filter: {prefs.min_rating}")
-                    query = query.where(User.rating >= prefs.min_rating)
-                if prefs.max_rating is not None:
-                    logger.debug(f"Max rating filter: {prefs.max_rating}")
-                    query = query.where(User.rating <= prefs.max_rating)
+    # photos of the next candidates in the feed, the bot warms them while this profile is on screen
+    upcoming_tg_ids = await peek_candidates(current_user_id, settings.PHOTO_PREFETCH_COUNT)
+    upcoming_cards = await profile_card_cache.load_many(session, upcoming_tg_ids)
+    upcoming_photos = [
+        upcoming_cards[tg_id]['photo'] for tg_id in upcoming_tg_ids
+        if tg_id in upcoming_cards and upcoming_cards[tg_id]['photo']
+    ]
 
-            logger.debug("Executing random profile query")
-            result = await session.execute(query.order_by(func.random()))
-            user = result.scalars().first()
+    return {
+        'status': 'success',
+        'profile': profile_data,
+        'upcoming_photos': upcoming_photos,
+        'user_tg_id': current_tg_id,
+        'action': 'next_profile'
+    }
 
-            if user:
-                full_name = " ".join(filter(None, [user.lastname, user.firstname, user.mname]))
-                profile_data = {
-                    "id": user.id,
-                    "firstname": user.firstname,
-                    "lastname": user.lastname,
-                    "mname": user.mname,
-                    "full_name": full_name,
-                    "photo": user.photo.url,
-                    "bio": user.bio,
-                    "age": user.age,
-                    "gender": user.gender,
-                    "rating": float(user.rating)
-                }
-                logger.info(f"Found matching profile: {user.id}")
 
-                response = {
-                    'status': 'success',
-                    'profile': profile_data,
-                    'user_tg_id': current_tg_id,
-                    'action': 'next_profile'
-                }
-            else:
-                logger.info("No matching profiles found")
-                response = {
-                    'status': 'empty',
-                    'user_tg_id': current_tg_id,
-                    'action': 'next_profile'
-                }
+async def process_get_next_profile(body: dict):
+    current_tg_id = body.get('current_tg_id')
+    commented_but_not_rated = body.get('commented_but_not_rated')
+    
+    logger.info(f"Processing next profile request for user {current_tg_id}")
+    logger.debug(f"Commented but not rated: {commented_but_not_rated}")
 
-            try:
-                logger.debug("Publishing response via RabbitMQ")
-                async with channel_pool.acquire() as channel:
-                    exchange = await channel.declare_exchange(
-                        'meeting_updates', 
-                        ExchangeType.TOPIC, 
-                        durable=True
-                    )
-                    
-                    await exchange.publish(
-                        aio_pika.Message(
-                            body=msgpack.packb(response),
-                            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                        ),
-                        routing_key=settings.USER_QUEUE.format(user_id=current_tg_id)
-                    )
-                logger.info("Response successfully published")
-            except Exception as e:
-                logger.error(f"Failed to publish response: {str(e)}")
-                raise
+    # every outcome is answered, the bot otherwise waits for the full RPC timeout
+    try:
+        async with async_session() as session:
+            response = await _next_profile_response(session, current_tg_id, commented_but_not_rated)
+    except Exception as e:
+        logger.error(f"Error processing next profile request: {str(e)}")
+        try:
+            await publish_reply(body, {
+                'status': 'error',
+                'user_tg_id': current_tg_id,
+                'error': str(e),
+                'action': 'next_profile'
+            })
+        except Exception as pub_err:
+            logger.error(f"Failed to send error response: {str(pub_err)}")
+        raise
 
-            return response
+    try:
+        logger.debug("Publishing response via RabbitMQ")
+        await publish_reply(body, response)
+        logger.info("Response successfully published")
+    except Exception as e:
+        logger.error(f"Failed to publish response: {str(e)}")
+        raise
 
-        except Exception as e:
-            logger.error(f"Error processing next profile request: {str(e)}")
-            raise
+    return response
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from consumer.storage.db import async_session
+from src.model.models import PhotoObject
+from src.storage.s3_yandex import object_key_from_url, s3_storage
+
+logger = logging.getLogger(__name__)
+
+
+async def reference_photo(session: AsyncSession, photo_url: str):
+    statement = insert(PhotoObject).values(url=photo_url, ref_count=1, released_at=None)
+    result = await session.execute(
+        statement
+        .on_conflict_do_update(
+            index_elements=[PhotoObject.url],
+            set_={'ref_count': PhotoObject.ref_count + 1, 'released_at': None}
+        )
+        .returning(literal_column('xmax = 0').label('inserted'))
+    )
+    # a new row means either a fresh upload or an object the sweep has just collected,
+    # the row lock held by the sweep guarantees the delete already happened in the second case
+    if result.scalar_one() and not await s3_storage.object_exists(object_key_from_url(photo_url)):
+        raise ValueError(f"Photo {photo_url} was collected, it has to be uploaded again")
+
+
+async def release_photo(session: AsyncSession, photo_url: str):
+    await session.execute(
+        update(PhotoObject)
+        .where(PhotoObject.url == photo_url)
+        .values(
+            ref_count=PhotoObject.ref_count - 1,
+            released_at=case((PhotoObject.ref_count == 1, datetime.utcnow()), else_=PhotoObject.released_at)
+        )
+    )
+
+
+async def _collect_batch(cutoff: datetime) -> int:
+    async with async_session() as session:
+        result = await session.execute(
+            select(PhotoObject.url)
+            .where(PhotoObject.ref_count == 0, PhotoObject.released_at < cutoff)
+            .limit(settings.PHOTO_GC_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        urls = result.scalars().all()
+        if not urls:
+            return 0
+
+        # objects are deleted while the rows are still locked, so a concurrent reference waits for the outcome
+        await s3_storage.delete_objects([object_key_from_url(url) for url in urls])
+        await session.execute(delete(PhotoObject).where(PhotoObject.url.in_(urls)))
+        await session.commit()
+    return len(urls)
+
+
+async def collect_photos() -> int:
+    # uploads are recorded with ref_count 0 before the object is written, so the rows cover every object to collect
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.PHOTO_GC_GRACE_SECONDS)
+    total = 0
+    while True:
+        collected = await _collect_batch(cutoff)
+        total += collected
+        if collected < settings.PHOTO_GC_BATCH_SIZE:
+            break
+    logger.info(f"Photo sweep finished, {total} photos deleted")
+    return total
+
+
+async def run_photo_gc():
+    logger.info(f"Starting photo garbage collector, interval {settings.PHOTO_GC_INTERVAL}s")
+    while True:
+        try:
+            await collect_photos()
+        except Exception as e:
+            logger.error(f"Failed to collect unreferenced photos: {str(e)}", exc_info=True)
+        await asyncio.sleep(settings.PHOTO_GC_INTERVAL)
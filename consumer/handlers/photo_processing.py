@@ -1,42 +1,55 @@
-import msgpack
 from sqlalchemy import select, update
 import logging
 from consumer.storage.db import async_session
 from src.model.models import User, Photo
-from consumer.storage.rabbit import channel_pool
-import aio_pika
-from aio_pika import ExchangeType
-from config.settings import settings
-from src.storage.s3_yandex import upload_photo_to_s3, get_photo_with_cache
+from consumer.storage.rabbit import publish_profiles_changed, publish_reply
+from consumer.handlers.photo_gc import reference_photo, release_photo
+from src.storage.profile_cards import profile_card_cache
+from src.storage.user_ids import user_id_cache
 
 logger = logging.getLogger(__name__)
 
 async def process_photo_update(body: dict):
     user_tg_id = body.get('user_tg_id')
-    file_data = body.get('file_data')
-    filename = body.get('filename')
+    s3_url = body.get('photo_url')
     
     logger.info(f"Processing photo update for user {user_tg_id}")
-    logger.debug(f"Filename: {filename}, Data size: {len(file_data) if file_data else 0} bytes")
+    logger.debug(f"Staged photo URL: {s3_url}")
 
     try:
-        logger.debug("Uploading photo to S3 storage")
-        s3_url = await upload_photo_to_s3(file=file_data, filename=filename)
-        logger.info(f"Photo uploaded successfully to {s3_url}")
+        if not s3_url:
+            raise ValueError("Missing photo_url in request")
 
         logger.debug("Updating photo URL in database")
         async with async_session() as session:
-            user = await session.execute(select(User).where(User.tg_id == user_tg_id))
-            user = user.scalar_one()
-            
-            await session.execute(
-                update(Photo)
-                .where(Photo.user_id == user.id)
-                .values(url=s3_url)
+            user_id = await user_id_cache.resolve(session, user_tg_id)
+            if user_id is None:
+                raise ValueError(f"User {user_tg_id} not found")
+
+            previous_url = await session.execute(
+                select(Photo.url).where(Photo.user_id == user_id).with_for_update()
             )
+            previous_url = previous_url.scalar_one_or_none()
+
+            if previous_url != s3_url:
+                await reference_photo(session, s3_url)
+                await session.execute(
+                    update(Photo)
+                    .where(Photo.user_id == user_id)
+                    .values(url=s3_url)
+                )
+                await session.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(profile_version=User.profile_version + 1)
+                )
+                if previous_url is not None:
+                    await release_photo(session, previous_url)
             
             await session.commit()
             logger.debug("Database update committed successfully")
+            cards = await profile_card_cache.refresh(session, [user_tg_id])
+            await publish_profiles_changed(cards)
 
         response = {
             'status': 'success',
@@ -46,20 +59,7 @@ async def process_photo_update(body: dict):
         }
 
         logger.debug("Publishing photo update notification")
-        async with channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange(
-                'photo_updates',
-                ExchangeType.TOPIC,
-                durable=True
-            )
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(response),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key=settings.USER_QUEUE.format(user_id=user_tg_id)
-            )
+        await publish_reply(body, response)
         logger.info("Photo update processed successfully")
 
     except Exception as e:
@@ -72,20 +72,7 @@ async def process_photo_update(body: dict):
         }
 
         try:
-            async with channel_pool.acquire() as channel:
-                exchange = await channel.declare_exchange(
-                    'photo_updates',
-                    ExchangeType.TOPIC,
-                    durable=True
-                )
-                
-                await exchange.publish(
-                    aio_pika.Message(
-                        body=msgpack.packb(response),
-                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                    ),
-                    routing_key=settings.USER_QUEUE.format(user_id=user_tg_id)
-                )
+            await publish_reply(body, response)
             logger.warning("Error notification sent successfully")
         except Exception as pub_err:
             logger.error(f"Failed to send error notification: {str(pub_err)}")
@@ -1,13 +1,10 @@
-import msgpack
 from sqlalchemy import update
 from typing import Dict, Any
 import logging
 from consumer.storage.db import async_session
 from src.model.models import User
-from consumer.storage.rabbit import channel_pool
-import aio_pika
-from aio_pika import ExchangeType
-from config.settings import settings
+from consumer.storage.rabbit import publish_profiles_changed, publish_reply
+from src.storage.profile_cards import profile_card_cache
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +22,7 @@ async def process_profile_update(body: Dict[str, Any]):
             result = await session.execute(
                 update(User)
                 .where(User.tg_id == user_tg_id)
-                .values(**update_data)
+                .values(**update_data, profile_version=User.profile_version + 1)
             )
             
             if result.rowcount == 0:
@@ -34,6 +31,8 @@ async def process_profile_update(body: Dict[str, Any]):
                 
             await session.commit()
             logger.info("Profile update committed successfully")
+            cards = await profile_card_cache.refresh(session, [user_tg_id])
+            await publish_profiles_changed(cards)
 
             response = {
                 'status': 'success',
@@ -54,24 +53,14 @@ async def process_profile_update(body: Dict[str, Any]):
 
     try:
         logger.debug("Publishing update response")
-        async with channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange(
-                'profile_updates', 
-                ExchangeType.TOPIC, 
-                durable=True
-            )
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(response),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                    headers={
-                        'user_id': str(user_tg_id),
-                        'action': response['action']
-                    }
-                ),
-                routing_key=settings.USER_QUEUE.format(user_id=user_tg_id)
-            )
+        await publish_reply(
+            body,
+            response,
+            headers={
+                'user_id': str(user_tg_id),
+                'action': response['action']
+            }
+        )
         logger.info("Response published successfully")
     except Exception as e:
         logger.critical(f"Failed to publish response: {str(e)}")
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import random
+
+from sqlalchemy import CTE, Insert, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from config.settings import settings
+from consumer.storage.db import async_session
+from consumer.storage.rabbit import publish_profiles_changed
+from src.model.models import User, UserRatingShard
+from src.storage.profile_cards import profile_card_cache
+
+logger = logging.getLogger(__name__)
+
+BASE_RATING = 2.5
+LIKE_WEIGHT = 0.1
+DISLIKE_WEIGHT = 0.15
+
+
+def rating_expression(like_count, dislike_count):
+    return func.greatest(0.0, func.least(5.0, BASE_RATING + like_count * LIKE_WEIGHT - dislike_count * DISLIKE_WEIGHT))
+
+
+def add_rating_deltas(deltas: CTE) -> Insert:
+    # votes for a popular profile spread over several rows instead of queueing on its users row
+    shard = random.randrange(settings.RATING_SHARDS)
+    statement = insert(UserRatingShard).from_select(
+        ['user_id', 'shard', 'likes', 'dislikes'],
+        select(deltas.c.user_id, literal(shard), deltas.c.likes, deltas.c.dislikes)
+        .where(or_(deltas.c.likes != 0, deltas.c.dislikes != 0))
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[UserRatingShard.user_id, UserRatingShard.shard],
+        set_={
+            'likes': UserRatingShard.likes + statement.excluded.likes,
+            'dislikes': UserRatingShard.dislikes + statement.excluded.dislikes
+        }
+    )
+
+
+def _fold_statement(limit: int):
+    # rows that a vote is writing right now are skipped and folded on the next pass
+    batch = (
+        select(UserRatingShard.user_id, UserRatingShard.shard)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte('batch')
+    )
+    folded = (
+        delete(UserRatingShard)
+        .where(UserRatingShard.user_id == batch.c.user_id, UserRatingShard.shard == batch.c.shard)
+        .returning(UserRatingShard.user_id, UserRatingShard.likes, UserRatingShard.dislikes)
+        .cte('folded')
+    )
+    totals = (
+        select(
+            folded.c.user_id,
+            func.sum(folded.c.likes).label('likes'),
+            func.sum(folded.c.dislikes).label('dislikes')
+        )
+        .group_by(folded.c.user_id)
+        .cte('totals')
+    )
+    like_count = User.like_count + totals.c.likes
+    dislike_count = User.dislike_count + totals.c.dislikes
+    users = (
+        update(User)
+        .where(User.id == totals.c.user_id)
+        .values(
+            rating=rating_expression(like_count, dislike_count),
+            like_count=like_count,
+            dislike_count=dislike_count,
+            profile_version=User.profile_version + 1
+        )
+        .returning(User.tg_id)
+        .cte('users')
+    )
+    return (
+        select(
+            select(func.count()).select_from(folded).scalar_subquery().label('shards'),
+            select(func.array_agg(users.c.tg_id)).scalar_subquery().label('tg_ids')
+        )
+    )
+
+
+async def fold_rating_shards() -> int:
+    total = 0
+    while True:
+        async with async_session() as session:
+            result = await session.execute(_fold_statement(settings.RATING_FOLD_BATCH_SIZE))
+            folded = result.one()
+            await session.commit()
+            tg_ids = folded.tg_ids or []
+            cards = await profile_card_cache.refresh(session, tg_ids)
+        await publish_profiles_changed(cards)
+
+        if folded.shards:
+            logger.debug(f"Folded {folded.shards} rating shards into {len(tg_ids)} users")
+        total += len(tg_ids)
+        if folded.shards < settings.RATING_FOLD_BATCH_SIZE:
+            return total
+
+
+async def run_rating_aggregator():
+    logger.info(f"Starting rating aggregator, interval {settings.RATING_FOLD_INTERVAL}s")
+    while True:
+        try:
+            await fold_rating_shards()
+        except Exception as e:
+            logger.error(f"Failed to fold rating shards: {str(e)}", exc_info=True)
+        await asyncio.sleep(settings.RATING_FOLD_INTERVAL)
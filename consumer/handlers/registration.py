@@ -2,6 +2,10 @@ from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 import logging
 from consumer.storage.db import async_session
+from consumer.handlers.photo_gc import reference_photo
+from consumer.storage.rabbit import publish_reply
+from src.storage.profile_cards import profile_card_cache
+from src.storage.user_ids import user_id_cache
 from src.model.models import User, Photo, Preference
 
 logger = logging.getLogger(__name__)
@@ -46,6 +50,7 @@ async def create_user_profile(body: dict) -> None:
                     url=user_data["photo"]
                 )
                 session.add(photo)
+                await reference_photo(session, photo.url)
                 
                 logger.debug("Creating default Preferences")
                 preferences = Preference(
@@ -62,6 +67,8 @@ async def create_user_profile(body: dict) -> None:
                 logger.debug("Committing transaction")
                 await session.commit()
                 logger.info(f"Successfully created profile for user {user_id}")
+                await user_id_cache.remember(user_id, user.id)
+                await profile_card_cache.refresh(session, [user_id])
             except IntegrityError as e:
                 await session.rollback()
                 logger.error(f"Integrity error creating user {user_id}: {str(e)}")
@@ -71,12 +78,28 @@ async def create_user_profile(body: dict) -> None:
                 logger.error(f"Error creating user {user_id}: {str(e)}")
                 raise
 
-    except KeyError as e:
-        logger.error(f"Missing required field in user data: {str(e)}")
-        raise
-    except IndexError as e:
-        logger.error(f"Invalid full_name format: {user_data['full_name']}")
-        raise
     except Exception as e:
-        logger.error(f"Unexpected error creating user profile: {str(e)}")
+        if isinstance(e, KeyError):
+            logger.error(f"Missing required field in user data: {str(e)}")
+        elif isinstance(e, IndexError):
+            logger.error(f"Invalid full_name format: {user_data['full_name']}")
+        else:
+            logger.error(f"Unexpected error creating user profile: {str(e)}")
+
+        try:
+            await publish_reply(body, {
+                'status': 'error',
+                'user_id': user_id,
+                'error': str(e),
+                'action': 'registration_failed'
+            })
+        except Exception as pub_err:
+            logger.error(f"Failed to send registration error for user {user_id}: {str(pub_err)}")
         raise
+
+    # the bot waits for this reply, so the user's next request never runs before the user row exists
+    await publish_reply(body, {
+        'status': 'success',
+        'user_id': user_id,
+        'action': 'user_registered'
+    })
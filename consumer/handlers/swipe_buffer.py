@@ -0,0 +1,297 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from redis.exceptions import ResponseError
+from sqlalchemy import Boolean, Integer, TIMESTAMP, and_, case, column, func, or_, select, values
+from sqlalchemy.dialects.postgresql import insert
+
+from config.settings import settings
+from consumer.handlers.rating import add_rating_deltas
+from consumer.storage.db import async_session
+from consumer.storage.redis import redis_client
+from src.model.models import Like, Match, User, UserRatingShard
+from src.storage.rabbit import shard_for_key
+
+logger = logging.getLogger(__name__)
+
+SWIPE_STREAM = 'swipes:{shard}'
+SWIPE_GROUP = 'swipe_flusher'
+SWIPE_CONSUMER = 'flusher'
+LIKED_KEY = 'liked:{user_id}'
+
+# user ids start at 1, the marker keeps a warmed set alive even when the user liked nobody
+LIKED_MARKER = 0
+
+# a rebuilt set is written only if nobody created it meanwhile, so it never overwrites a vote applied in between
+FILL_LIKED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+for i = 1, #ARGV, 5000 do
+    redis.call('SADD', KEYS[1], unpack(ARGV, i, math.min(i + 4999, #ARGV)))
+end
+return 1
+"""
+
+# votes only touch warmed sets and return -1 otherwise, the caller warms them and votes again;
+# the update and the reverse check run atomically, so of two crossing likes exactly one sees the match
+VOTE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('EXISTS', KEYS[2]) == 0 then
+    return -1
+end
+if ARGV[3] == '1' then
+    redis.call('SADD', KEYS[1], ARGV[1])
+else
+    redis.call('SREM', KEYS[1], ARGV[1])
+end
+return redis.call('SISMEMBER', KEYS[2], ARGV[2])
+"""
+
+_fill_liked = redis_client.register_script(FILL_LIKED_SCRIPT)
+_vote = redis_client.register_script(VOTE_SCRIPT)
+
+
+def _card(user) -> dict:
+    return {
+        'tg_id': user.tg_id,
+        'tg_username': user.tg_username,
+        'firstname': user.firstname,
+        'lastname': user.lastname
+    }
+
+
+async def _buffered_votes(user_tg_ids: Dict[int, int]) -> List[dict]:
+    streams = {SWIPE_STREAM.format(shard=shard_for_key(tg_id)) for tg_id in user_tg_ids.values()}
+    swipes = []
+    for stream in streams:
+        swipes.extend(
+            swipe for swipe in _parse_swipes(await redis_client.xrange(stream))
+            if swipe['from_user_id'] in user_tg_ids
+        )
+    return swipes
+
+
+async def _warm_liked_sets(user_tg_ids: Dict[int, int]):
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id in user_tg_ids:
+            pipe.exists(LIKED_KEY.format(user_id=user_id))
+        warmed = await pipe.execute()
+
+    cold = {user_id: tg_id for (user_id, tg_id), exists in zip(user_tg_ids.items(), warmed) if not exists}
+    if not cold:
+        return
+
+    # votes still in the stream are not in Postgres yet; the stream is read first,
+    # so a batch flushed in between shows up in both reads instead of neither
+    buffered = await _buffered_votes(cold)
+
+    logger.debug(f"Loading liked sets for users {list(cold)} from Postgres")
+    async with async_session() as session:
+        result = await session.execute(
+            select(Like.from_user_id, Like.to_user_id)
+            .where(Like.from_user_id.in_(cold), Like.is_like == True)
+        )
+        liked: Dict[int, Set[int]] = {user_id: {LIKED_MARKER} for user_id in cold}
+        for from_user_id, to_user_id in result.all():
+            liked[from_user_id].add(to_user_id)
+
+    for swipe in buffered:
+        if swipe['is_like']:
+            liked[swipe['from_user_id']].add(swipe['to_user_id'])
+        else:
+            liked[swipe['from_user_id']].discard(swipe['to_user_id'])
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id, to_user_ids in liked.items():
+            await _fill_liked(keys=[LIKED_KEY.format(user_id=user_id)], args=list(to_user_ids), client=pipe)
+        await pipe.execute()
+
+
+async def buffer_vote(from_user_tg_id: int, to_user_id: int, is_like: bool) -> Optional[dict]:
+    async with async_session() as session:
+        result = await session.execute(
+            select(User.id, User.tg_id, User.tg_username, User.firstname, User.lastname)
+            .where(or_(User.tg_id == from_user_tg_id, User.id == to_user_id))
+        )
+        users = result.all()
+
+    sender = next((user for user in users if user.tg_id == from_user_tg_id), None)
+    target = next((user for user in users if user.id == to_user_id), None)
+    if sender is None or target is None:
+        raise ValueError(f"Unknown users in vote: tg_id {from_user_tg_id} -> user {to_user_id}")
+
+    keys = [LIKED_KEY.format(user_id=sender.id), LIKED_KEY.format(user_id=to_user_id)]
+    while True:
+        reverse_like = await _vote(keys=keys, args=[to_user_id, sender.id, int(is_like)])
+        if reverse_like >= 0:
+            break
+        await _warm_liked_sets({sender.id: sender.tg_id, to_user_id: target.tg_id})
+
+    is_match = bool(is_like and reverse_like)
+    await redis_client.xadd(
+        SWIPE_STREAM.format(shard=shard_for_key(from_user_tg_id)),
+        {
+            'from_user_id': sender.id,
+            'to_user_id': to_user_id,
+            'is_like': int(is_like),
+            'liked_at': datetime.utcnow().isoformat(),
+            'match': int(is_match)
+        }
+    )
+    logger.debug(f"Buffered {'like' if is_like else 'dislike'} from user {sender.id} to user {to_user_id}")
+
+    if not is_match:
+        return None
+    return {'matched_user': _card(target), 'from_user_data': _card(sender)}
+
+
+def _parse_swipes(entries: List[Tuple[bytes, dict]]) -> List[dict]:
+    # a pair swiped twice within one batch keeps only its latest vote
+    swipes: Dict[Tuple[int, int], dict] = {}
+    for _, fields in entries:
+        swipe = {
+            'from_user_id': int(fields[b'from_user_id']),
+            'to_user_id': int(fields[b'to_user_id']),
+            'is_like': fields[b'is_like'] == b'1',
+            'liked_at': datetime.fromisoformat(fields[b'liked_at'].decode()),
+            'match': fields[b'match'] == b'1'
+        }
+        swipes[(swipe['from_user_id'], swipe['to_user_id'])] = swipe
+    return list(swipes.values())
+
+
+def _flush_statement(swipes: List[dict]):
+    batch = (
+        select(
+            values(
+                column('from_user_id', Integer),
+                column('to_user_id', Integer),
+                column('is_like', Boolean),
+                column('liked_at', TIMESTAMP),
+                column('match', Boolean),
+                name='swipes'
+            ).data([
+                (swipe['from_user_id'], swipe['to_user_id'], swipe['is_like'], swipe['liked_at'], swipe['match'])
+                for swipe in swipes
+            ])
+        )
+        .cte('batch')
+    )
+
+    # every CTE reads the snapshot taken before the statement, so these are the votes being replaced
+    previous = (
+        select(batch.c.to_user_id, batch.c.is_like, Like.is_like.label('previous_is_like'))
+        .select_from(batch)
+        .outerjoin(Like, and_(Like.from_user_id == batch.c.from_user_id, Like.to_user_id == batch.c.to_user_id))
+        .cte('previous')
+    )
+
+    insert_likes = insert(Like).from_select(
+        ['from_user_id', 'to_user_id', 'is_like', 'liked_at'],
+        select(batch.c.from_user_id, batch.c.to_user_id, batch.c.is_like, batch.c.liked_at)
+    )
+    upsert = (
+        insert_likes
+        .on_conflict_do_update(
+            index_elements=[Like.from_user_id, Like.to_user_id],
+            set_={'is_like': insert_likes.excluded.is_like, 'liked_at': insert_likes.excluded.liked_at}
+        )
+        .returning(Like.from_user_id)
+        .cte('upsert')
+    )
+
+    deltas = (
+        select(
+            previous.c.to_user_id.label('user_id'),
+            func.sum(
+                case((previous.c.is_like == True, 1), else_=0)
+                - case((previous.c.previous_is_like == True, 1), else_=0)
+            ).label('likes'),
+            func.sum(
+                case((previous.c.is_like == False, 1), else_=0)
+                - case((previous.c.previous_is_like == False, 1), else_=0)
+            ).label('dislikes')
+        )
+        .group_by(previous.c.to_user_id)
+        .cte('deltas')
+    )
+    counters = add_rating_deltas(deltas).returning(UserRatingShard.user_id).cte('counters')
+
+    new_matches = (
+        insert(Match)
+        .from_select(
+            ['user1_id', 'user2_id', 'matched_at'],
+            select(
+                func.least(batch.c.from_user_id, batch.c.to_user_id),
+                func.greatest(batch.c.from_user_id, batch.c.to_user_id),
+                batch.c.liked_at
+            )
+            .where(batch.c.match == True)
+        )
+        .on_conflict_do_nothing(constraint='uq_matches_user1_user2')
+        .returning(Match.id)
+        .cte('new_matches')
+    )
+
+    return (
+        select(
+            select(func.count()).select_from(upsert).scalar_subquery().label('likes'),
+            select(func.count()).select_from(counters).scalar_subquery().label('users'),
+            select(func.count()).select_from(new_matches).scalar_subquery().label('matches')
+        )
+    )
+
+
+async def flush_swipes(stream: str, pending: bool) -> int:
+    response = await redis_client.xreadgroup(
+        SWIPE_GROUP,
+        SWIPE_CONSUMER,
+        {stream: '0' if pending else '>'},
+        count=settings.SWIPE_FLUSH_BATCH_SIZE,
+        block=None if pending else int(settings.SWIPE_FLUSH_INTERVAL * 1000)
+    )
+    entries = response[0][1] if response else []
+    if not entries:
+        return 0
+
+    swipes = _parse_swipes(entries)
+    async with async_session() as session:
+        result = await session.execute(_flush_statement(swipes))
+        flushed = result.one()
+        await session.commit()
+
+    entry_ids = [entry_id for entry_id, _ in entries]
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.xack(stream, SWIPE_GROUP, *entry_ids)
+        pipe.xdel(stream, *entry_ids)
+        await pipe.execute()
+
+    logger.info(
+        f"Flushed {len(entries)} swipes from {stream}: {flushed.likes} likes, "
+        f"{flushed.users} rating shard updates, {flushed.matches} new matches"
+    )
+    return len(entries)
+
+
+async def run_swipe_flusher(shard: int):
+    stream = SWIPE_STREAM.format(shard=shard)
+    try:
+        await redis_client.xgroup_create(stream, SWIPE_GROUP, id='0', mkstream=True)
+    except ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+    logger.info(f"Starting swipe flusher for {stream}")
+    # entries read but not acknowledged before a restart are flushed again first, replaying a batch is harmless
+    pending = True
+    while True:
+        try:
+            flushed = await flush_swipes(stream, pending)
+            if pending and not flushed:
+                pending = False
+        except Exception as e:
+            logger.error(f"Failed to flush swipes from {stream}: {str(e)}", exc_info=True)
+            pending = True
+            await asyncio.sleep(settings.SWIPE_FLUSH_INTERVAL)
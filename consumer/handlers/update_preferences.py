@@ -1,12 +1,10 @@
-import msgpack
-from sqlalchemy import update, select
+from sqlalchemy import update
 import logging
 from consumer.storage.db import async_session
-from src.model.models import User, Preference
-from consumer.storage.rabbit import channel_pool
-import aio_pika
-from aio_pika import ExchangeType
-from config.settings import settings
+from consumer.handlers.feed import invalidate_feed
+from src.model.models import Preference
+from consumer.storage.rabbit import publish_invalidation, publish_reply
+from src.storage.user_ids import user_id_cache
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +21,9 @@ async def update_preferences_handler(body: dict):
     
     try:
         async with async_session() as session:
-            logger.debug("Fetching user ID from database")
-            result = await session.execute(
-                select(User.id).where(User.tg_id == user_tg_id))
-            user_id = result.scalar_one()
+            user_id = await user_id_cache.resolve(session, user_tg_id)
+            if user_id is None:
+                raise ValueError(f"User {user_tg_id} not found")
             logger.debug(f"Found user ID: {user_id}")
 
             logger.debug("Updating preferences in database")
@@ -43,6 +40,9 @@ async def update_preferences_handler(body: dict):
             await session.commit()
             logger.info("Preferences updated successfully")
 
+            await invalidate_feed(user_id)
+            await publish_invalidation('preferences_changed', tg_id=user_tg_id)
+
             response_body = {
                 'user_tg_id': user_tg_id,
                 'status': 'updated',
@@ -50,24 +50,14 @@ async def update_preferences_handler(body: dict):
             }
 
             logger.debug("Publishing update notification")
-            async with channel_pool.acquire() as channel:
-                exchange = await channel.declare_exchange(
-                    'preferences_updates', 
-                    ExchangeType.TOPIC, 
-                    durable=True
-                )
-                
-                await exchange.publish(
-                    aio_pika.Message(
-                        body=msgpack.packb(response_body),
-                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                        headers={
-                            'user_id': str(user_tg_id),
-                            'action': 'preferences_updated'
-                        }
-                    ),
-                    routing_key=settings.USER_QUEUE.format(user_id=user_tg_id)
-                )
+            await publish_reply(
+                body,
+                response_body,
+                headers={
+                    'user_id': str(user_tg_id),
+                    'action': 'preferences_updated'
+                }
+            )
             logger.info("Update notification sent successfully")
 
     except Exception as e:
@@ -80,20 +70,7 @@ async def update_preferences_handler(body: dict):
         }
         
         try:
-            async with channel_pool.acquire() as channel:
-                exchange = await channel.declare_exchange(
-                    'preferences_updates', 
-                    ExchangeType.TOPIC, 
-                    durable=True
-                )
-                
-                await exchange.publish(
-                    aio_pika.Message(
-                        body=msgpack.packb(error_response),
-                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                    ),
-                    routing_key=settings.USER_QUEUE.format(user_id=user_tg_id)
-                )
+            await publish_reply(body, error_response)
             logger.warning("Error notification sent successfully")
         except Exception as pub_err:
             logger.error(f"Failed to send error notification: {str(pub_err)}")
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased
+
+from consumer.handlers.rating import rating_expression
+from consumer.storage.db import async_session, engine
+from consumer.storage.rabbit import channel_pool, connection_pool, publish_profiles_changed
+from src.model.models import Like, Match, User, UserRatingShard
+from src.storage.profile_cards import profile_card_cache
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+async def reconcile_ratings() -> int:
+    # votes still waiting in rating shards are added to users by the aggregator later, so they are left out here
+    like_count = (
+        select(func.count())
+        .where(Like.to_user_id == User.id, Like.is_like == True)
+        .scalar_subquery()
+        - select(func.coalesce(func.sum(UserRatingShard.likes), 0))
+        .where(UserRatingShard.user_id == User.id)
+        .scalar_subquery()
+    )
+    dislike_count = (
+        select(func.count())
+        .where(Like.to_user_id == User.id, Like.is_like == False)
+        .scalar_subquery()
+        - select(func.coalesce(func.sum(UserRatingShard.dislikes), 0))
+        .where(UserRatingShard.user_id == User.id)
+        .scalar_subquery()
+    )
+
+    async with async_session() as session:
+        max_id = (await session.execute(select(func.max(User.id)))).scalar() or 0
+
+    fixed = 0
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        async with async_session() as session:
+            result = await session.execute(
+                update(User)
+                .where(
+                    User.id >= start,
+                    User.id < start + BATCH_SIZE,
+                    or_(User.like_count != like_count, User.dislike_count != dislike_count)
+                )
+                .values(
+                    like_count=like_count,
+                    dislike_count=dislike_count,
+                    rating=rating_expression(like_count, dislike_count),
+                    profile_version=User.profile_version + 1
+                )
+                .returning(User.tg_id)
+                .execution_options(synchronize_session=False)
+            )
+            tg_ids = result.scalars().all()
+            await session.commit()
+            if tg_ids:
+                logger.warning(f"Fixed rating counters for {len(tg_ids)} users with ids {start}..{start + BATCH_SIZE - 1}")
+                cards = await profile_card_cache.refresh(session, tg_ids)
+                # bots keep cards in memory too, without the event they show the old rating until the local TTL
+                await publish_profiles_changed(cards)
+            fixed += len(tg_ids)
+
+    logger.info(f"Rating reconciliation finished, {fixed} users fixed")
+    return fixed
+
+
+async def reconcile_matches() -> int:
+    # mutual likes that lost their match row, e.g. to a crash between the vote and the match insert
+    reverse = aliased(Like)
+    async with async_session() as session:
+        result = await session.execute(
+            insert(Match)
+            .from_select(
+                ['user1_id', 'user2_id', 'matched_at'],
+                select(Like.from_user_id, Like.to_user_id, func.greatest(Like.liked_at, reverse.liked_at))
+                .join(reverse, and_(reverse.from_user_id == Like.to_user_id, reverse.to_user_id == Like.from_user_id))
+                .where(Like.from_user_id < Like.to_user_id, Like.is_like == True, reverse.is_like == True)
+            )
+            .on_conflict_do_nothing(constraint='uq_matches_user1_user2')
+            .returning(Match.id)
+        )
+        restored = len(result.all())
+        await session.commit()
+
+    if restored:
+        logger.warning(f"Restored {restored} missing matches for mutual likes")
+    logger.info(f"Match reconciliation finished, {restored} matches restored")
+    return restored
+
+
+async def main():
+    try:
+        await reconcile_ratings()
+        await reconcile_matches()
+    finally:
+        await engine.dispose()
+        await channel_pool.close()
+        await connection_pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -5,7 +5,6 @@ import sys
 import os
 import logging
 from config.settings import settings
-from src.model.meta import Base
 
 logger = logging.getLogger(__name__)
 
@@ -34,16 +33,6 @@ def create_db_session(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
 engine = create_db_engine()
 async_session = create_db_session(engine)
 
-async def create_tables():
-    logger.info("Creating database tables")
-    try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Tables created successfully")
-    except Exception as e:
-        logger.error("Failed to create tables: %s", str(e))
-        raise
-
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     logger.debug("Creating new database session")
     session = async_session()
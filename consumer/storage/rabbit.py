@@ -1,8 +1,15 @@
+import logging
+from typing import List, Optional
+
 import aio_pika
+import msgpack
 from aio_pika.abc import AbstractChannel, AbstractRobustConnection
 from aio_pika.pool import Pool
 
 from config.settings import settings
+from src.storage.rabbit import INVALIDATION_EXCHANGE, topology
+
+logger = logging.getLogger(__name__)
 
 
 async def get_connection() -> AbstractRobustConnection:
@@ -19,3 +26,38 @@ async def get_channel() -> AbstractChannel:
 
 
 channel_pool: Pool = Pool(get_channel, max_size=10)
+
+
+async def publish_reply(request: dict, response: dict, headers: Optional[dict] = None) -> None:
+    reply_to = request.get('reply_to')
+    if not reply_to:
+        logger.warning(f"Request has no reply_to, dropping response: {response}")
+        return
+
+    async with channel_pool.acquire() as channel:
+        await channel.default_exchange.publish(
+            aio_pika.Message(
+                body=msgpack.packb(response),
+                correlation_id=request.get('correlation_id'),
+                headers=headers
+            ),
+            routing_key=reply_to
+        )
+
+
+async def publish_invalidation(event: str, **fields) -> None:
+    # runs after commit, a lost event only leaves bot caches stale until their local TTL
+    try:
+        async with channel_pool.acquire() as channel:
+            exchange = await topology.get_exchange(channel, INVALIDATION_EXCHANGE)
+            await exchange.publish(
+                aio_pika.Message(body=msgpack.packb({'event': event, **fields})),
+                routing_key=''
+            )
+    except Exception as e:
+        logger.error(f"Failed to publish {event} invalidation: {str(e)}")
+
+
+async def publish_profiles_changed(cards: List[dict]) -> None:
+    if cards:
+        await publish_invalidation('profile_changed', profiles=[[card['tg_id'], card['version']] for card in cards])
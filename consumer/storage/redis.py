@@ -0,0 +1,6 @@
+from redis.asyncio import Redis
+
+from config.settings import settings
+
+
+redis_client = Redis.from_url(settings.redis_url)
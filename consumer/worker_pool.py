@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List
+
+import msgpack
+from aio_pika.abc import AbstractIncomingMessage
+
+from config.settings import settings
+from src.storage.rabbit import get_user_key, key_hash
+
+logger = logging.getLogger(__name__)
+
+
+def lane_for_key(key: Any, lanes: int) -> int:
+    # the low bits of the hash already select the shard queue, so lanes use the rest
+    return (key_hash(key) // settings.CONSUMER_SHARDS) % lanes
+
+
+class WorkerPool:
+    def __init__(self, name: str, handler: Callable[[Dict[str, Any]], Awaitable[None]], lanes: int):
+        self.name = name
+        self._handler = handler
+        self._lanes: List[asyncio.Queue] = [asyncio.Queue() for _ in range(lanes)]
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        logger.info(f"Starting {self.name} worker pool with {len(self._lanes)} lanes")
+        for index, lane in enumerate(self._lanes):
+            self._tasks.append(asyncio.create_task(self._worker(index, lane)))
+
+    async def submit(self, message: AbstractIncomingMessage):
+        try:
+            logger.debug(f"Received message: {message.body[:100]}...")
+            body = msgpack.unpackb(message.body)
+        except Exception as e:
+            logger.error(f"Failed to decode message: {str(e)}", exc_info=True)
+            await message.reject()
+            return
+
+        if message.reply_to:
+            body['reply_to'] = message.reply_to
+            body['correlation_id'] = message.correlation_id
+
+        lane = lane_for_key(get_user_key(body), len(self._lanes))
+        await self._lanes[lane].put((message, body))
+
+    async def _worker(self, index: int, lane: asyncio.Queue):
+        while True:
+            message, body = await lane.get()
+            try:
+                async with message.process(ignore_processed=True):
+                    try:
+                        await self._handler(body)
+                        logger.debug(f"Message processed in lane {index}")
+                    except Exception as e:
+                        logger.error(f"Error processing message in lane {index}: {str(e)}", exc_info=True)
+            except Exception as e:
+                logger.error(f"Failed to acknowledge message in lane {index}: {str(e)}", exc_info=True)
+            finally:
+                lane.task_done()
+
+    def backlog(self) -> List[int]:
+        return [lane.qsize() for lane in self._lanes]
+
+    async def report_backlog(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            backlog = self.backlog()
+            busy = {index: size for index, size in enumerate(backlog) if size}
+            logger.info(f"{self.name} worker pool backlog: total={sum(backlog)}, max={max(backlog, default=0)}, lanes={busy}")
+
+    async def stop(self):
+        logger.info(f"Stopping {self.name} worker pool")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+
+from consumer.handlers.feed import candidate_query
+from consumer.storage.db import engine
+from src.model.models import Like, Match, Photo, Preference, User
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_PREFERENCES = Preference(
+    preferred_gender="Женский",
+    min_age=18,
+    max_age=30,
+    min_rating=0.0,
+    max_rating=5.0,
+)
+
+HOT_QUERIES: Dict[str, Select] = {
+    'user_by_tg_id': select(User).where(User.tg_id == 1),
+    'preferences_by_user': select(Preference).where(Preference.user_id == 1),
+    'photo_by_user': select(Photo).where(Photo.user_id == 1),
+    'feed_candidates': (
+        candidate_query(1, SAMPLE_PREFERENCES, [2, 3])
+        .where(User.random_key >= 0.5)
+        .order_by(User.random_key)
+        .limit(50)
+    ),
+    'like_counts': select(func.count()).where(Like.to_user_id == 1, Like.is_like == True),
+    'mutual_like': select(Like).where(Like.from_user_id == 2, Like.to_user_id == 1, Like.is_like == True),
+    'matches_page': (
+        select(Match)
+        .where(Match.user2_id == 1, tuple_(Match.matched_at, Match.id) < tuple_(datetime(2030, 1, 1), 100))
+        .order_by(Match.matched_at.desc(), Match.id.desc())
+        .limit(11)
+    ),
+}
+
+
+def find_seq_scans(plan: dict) -> List[str]:
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+async def check_plans() -> Dict[str, List[str]]:
+    problems = {}
+    async with engine.connect() as conn:
+        # with sequential scans disabled the planner still falls back to one only if no index can serve the query
+        await conn.execute(text('SET enable_seqscan = off'))
+        for name, query in HOT_QUERIES.items():
+            sql = query.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True})
+            result = await conn.execute(text(f'EXPLAIN (FORMAT JSON) {sql}'))
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+
+            tables = find_seq_scans(plan[0]['Plan'])
+            if tables:
+                problems[name] = tables
+                logger.warning(f"Query '{name}' falls back to a sequential scan on {tables}")
+            else:
+                logger.info(f"Query '{name}' is served by indexes")
+    await engine.dispose()
+    return problems
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    sys.exit(1 if asyncio.run(check_plans()) else 0)
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config.settings import settings
+from src.model.meta import DEFAULT_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+BASELINE_REVISION = '0001'
+
+
+async def needs_baseline_stamp() -> bool:
+    # deployments created by Base.metadata.create_all already have the 0001 schema but no alembic_version table
+    engine = create_async_engine(settings.db_url)
+    try:
+        async with engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names(schema=DEFAULT_SCHEMA))
+    finally:
+        await engine.dispose()
+    return 'users' in tables and 'alembic_version' not in tables
+
+
+def upgrade():
+    config = Config('alembic.ini')
+    if asyncio.run(needs_baseline_stamp()):
+        logger.warning(f"Schema exists without migration history, stamping revision {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, 'head')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    upgrade()
@@ -0,0 +1,101 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+Existing databases created by Base.metadata.create_all already have
+this schema. `python -m migrations.upgrade` stamps them with 0001 before
+upgrading, a plain `alembic upgrade head` needs `alembic stamp 0001` first.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tg_id', sa.BigInteger(), nullable=False),
+        sa.Column('tg_username', sa.String(length=50), nullable=True),
+        sa.Column('firstname', sa.String(length=25), nullable=False),
+        sa.Column('lastname', sa.String(length=25), nullable=False),
+        sa.Column('mname', sa.String(length=25), nullable=False),
+        sa.Column('age', sa.Integer(), nullable=False),
+        sa.Column('gender', sa.String(), nullable=False),
+        sa.Column('bio', sa.String(length=200), nullable=False),
+        sa.Column('rating', sa.Numeric(precision=3, scale=2), nullable=False),
+        sa.Column('like_count', sa.Integer(), nullable=False),
+        sa.Column('dislike_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+        sa.CheckConstraint('age BETWEEN 10 AND 110', name=op.f('ck_users_ck_users_age_range')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_users')),
+        sa.UniqueConstraint('tg_id', name=op.f('uq_users_tg_id')),
+        schema='public'
+    )
+    op.create_table(
+        'likes',
+        sa.Column('from_user_id', sa.Integer(), nullable=False),
+        sa.Column('to_user_id', sa.Integer(), nullable=False),
+        sa.Column('is_like', sa.Boolean(), nullable=False),
+        sa.Column('liked_at', sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(['from_user_id'], ['public.users.id'], name=op.f('fk_likes_from_user_id_users')),
+        sa.ForeignKeyConstraint(['to_user_id'], ['public.users.id'], name=op.f('fk_likes_to_user_id_users')),
+        sa.PrimaryKeyConstraint('from_user_id', 'to_user_id', name=op.f('pk_likes')),
+        schema='public'
+    )
+    op.create_table(
+        'matches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user1_id', sa.Integer(), nullable=False),
+        sa.Column('user2_id', sa.Integer(), nullable=False),
+        sa.Column('matched_at', sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(['user1_id'], ['public.users.id'], name=op.f('fk_matches_user1_id_users')),
+        sa.ForeignKeyConstraint(['user2_id'], ['public.users.id'], name=op.f('fk_matches_user2_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_matches')),
+        sa.UniqueConstraint('user1_id', 'user2_id', name='uq_matches_user1_user2'),
+        schema='public'
+    )
+    op.create_table(
+        'photos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('added_at', sa.TIMESTAMP(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['public.users.id'], name=op.f('fk_photos_user_id_users')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_photos')),
+        sa.UniqueConstraint('user_id', name=op.f('uq_photos_user_id')),
+        schema='public'
+    )
+    op.create_table(
+        'preferences',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('preferred_gender', sa.String(), nullable=False),
+        sa.Column('min_age', sa.Integer(), nullable=False),
+        sa.Column('max_age', sa.Integer(), nullable=False),
+        sa.Column('min_rating', sa.Numeric(precision=2, scale=1), nullable=False),
+        sa.Column('max_rating', sa.Numeric(precision=2, scale=1), nullable=False),
+        sa.CheckConstraint('min_age >= 10', name=op.f('ck_preferences_ck_preferences_min_age')),
+        sa.CheckConstraint('max_age <= 110', name=op.f('ck_preferences_ck_preferences_max_age')),
+        sa.CheckConstraint('min_rating >= 0 AND min_rating <= 5', name=op.f('ck_preferences_ck_preferences_min_rating')),
+        sa.CheckConstraint('max_rating >= 0 AND max_rating <= 5', name=op.f('ck_preferences_ck_preferences_max_rating')),
+        sa.ForeignKeyConstraint(['user_id'], ['public.users.id'], name=op.f('fk_preferences_user_id_users')),
+        sa.PrimaryKeyConstraint('user_id', name=op.f('pk_preferences')),
+        schema='public'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('preferences', schema='public')
+    op.drop_table('photos', schema='public')
+    op.drop_table('matches', schema='public')
+    op.drop_table('likes', schema='public')
+    op.drop_table('users', schema='public')
@@ -0,0 +1,35 @@
+"""hot path indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('random_key', sa.Float(), server_default=sa.text('random()'), nullable=False),
+        schema='public'
+    )
+    op.create_index(op.f('ix_public_users_random_key'), 'users', ['random_key'], unique=False, schema='public')
+    op.create_index('ix_users_gender_age_rating', 'users', ['gender', 'age', 'rating'], unique=False, schema='public')
+    op.create_index('ix_likes_to_user_id_is_like', 'likes', ['to_user_id', 'is_like'], unique=False, schema='public')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_likes_to_user_id_is_like', table_name='likes', schema='public')
+    op.drop_index('ix_users_gender_age_rating', table_name='users', schema='public')
+    op.drop_index(op.f('ix_public_users_random_key'), table_name='users', schema='public')
+    op.drop_column('users', 'random_key', schema='public')
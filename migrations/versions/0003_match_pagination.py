@@ -0,0 +1,35 @@
+"""match pagination
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 19:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_check_constraint(
+        op.f('ck_matches_ck_matches_user_order'), 'matches', 'user1_id < user2_id', schema='public'
+    )
+    op.create_index(
+        'ix_matches_user1_id_matched_at', 'matches', ['user1_id', 'matched_at', 'id'], unique=False, schema='public'
+    )
+    op.create_index(
+        'ix_matches_user2_id_matched_at', 'matches', ['user2_id', 'matched_at', 'id'], unique=False, schema='public'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_matches_user2_id_matched_at', table_name='matches', schema='public')
+    op.drop_index('ix_matches_user1_id_matched_at', table_name='matches', schema='public')
+    op.drop_constraint(op.f('ck_matches_ck_matches_user_order'), 'matches', schema='public', type_='check')
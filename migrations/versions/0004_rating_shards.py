@@ -0,0 +1,34 @@
+"""rating shards
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 20:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_rating_shards',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.Integer(), nullable=False),
+        sa.Column('likes', sa.Integer(), nullable=False),
+        sa.Column('dislikes', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['public.users.id'], name=op.f('fk_user_rating_shards_user_id_users')),
+        sa.PrimaryKeyConstraint('user_id', 'shard', name=op.f('pk_user_rating_shards')),
+        schema='public'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_rating_shards', schema='public')
@@ -0,0 +1,42 @@
+"""photo objects
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 21:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'photo_objects',
+        sa.Column('url', sa.String(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('released_at', sa.TIMESTAMP(), nullable=True),
+        sa.CheckConstraint('ref_count >= 0', name=op.f('ck_photo_objects_ck_photo_objects_ref_count')),
+        sa.PrimaryKeyConstraint('url', name=op.f('pk_photo_objects')),
+        schema='public'
+    )
+    op.create_index(
+        'ix_photo_objects_released_at', 'photo_objects', ['released_at'], unique=False, schema='public',
+        postgresql_where=sa.text('ref_count = 0')
+    )
+    op.execute(
+        'INSERT INTO public.photo_objects (url, ref_count) '
+        'SELECT url, count(*) FROM public.photos GROUP BY url'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_photo_objects_released_at', table_name='photo_objects', schema='public')
+    op.drop_table('photo_objects', schema='public')
@@ -0,0 +1,27 @@
+"""profile version
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 22:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users', sa.Column('profile_version', sa.Integer(), server_default='0', nullable=False), schema='public'
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'profile_version', schema='public')
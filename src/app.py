@@ -2,16 +2,38 @@ import asyncio
 import logging
 from bot import dp
 from core.bot_instance import bot_instance as bot
-from storage.redis_client import photo_cache
-from storage.db import create_tables
+from core.send_scheduler import send_scheduler
+from handlers.handlers import drain_notifications
+from src.storage.redis_client import photo_cache
+from src.storage.profile_cards import profile_card_cache
+from src.storage.user_ids import user_id_cache
+from src.storage.preferences_cache import preferences_cache
+from storage.s3_yandex import s3_storage
+from src.storage.images import start_image_pool, shutdown_image_pool
+from src.storage.rabbit import rpc_client, invalidation_listener
 
 logger = logging.getLogger(__name__)
 
+def on_profile_changed(event: dict):
+    for tg_id, version in event['profiles']:
+        profile_card_cache.evict(tg_id, version)
+
+def on_preferences_changed(event: dict):
+    preferences_cache.evict(event['tg_id'])
+
 async def main():
     logger.info("Запуск бота")
     try:
-        logger.info("Создание таблиц в базе данных")
-        await create_tables()
+        logger.info("Подключение клиента RPC к RabbitMQ")
+        await rpc_client.connect()
+
+        invalidation_listener.subscribe('profile_changed', on_profile_changed)
+        invalidation_listener.subscribe('preferences_changed', on_preferences_changed)
+        await invalidation_listener.connect()
+
+        logger.info("Подключение к хранилищу S3")
+        await s3_storage.start()
+        start_image_pool()
         
         logger.info("Запуск long-polling бота")
         await dp.start_polling(bot)
@@ -25,6 +47,37 @@ async def main():
             logger.debug("Соединение с Redis закрыто")
         except Exception as e:
             logger.error(f"Ошибка при закрытии соединения с Redis: {str(e)}")
+
+        try:
+            await profile_card_cache.close()
+            await user_id_cache.close()
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии кэшей профилей: {str(e)}")
+        
+        try:
+            shutdown_image_pool()
+        except Exception as e:
+            logger.error(f"Ошибка при остановке пула обработки изображений: {str(e)}")
+
+        try:
+            await s3_storage.close()
+            logger.debug("Клиенты S3 и HTTP закрыты")
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии клиентов S3: {str(e)}")
+
+        try:
+            await drain_notifications()
+            await send_scheduler.close()
+            logger.debug("Планировщик отправки сообщений остановлен")
+        except Exception as e:
+            logger.error(f"Ошибка при остановке планировщика отправки: {str(e)}")
+
+        try:
+            await invalidation_listener.close()
+            await rpc_client.close()
+            logger.debug("Клиент RPC закрыт")
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии клиента RPC: {str(e)}")
         
         try:
             await dp.storage.close()
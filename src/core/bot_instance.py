@@ -2,8 +2,10 @@ from aiogram import Bot
 from config.settings import settings
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from core.send_scheduler import send_scheduler
 
 bot_instance = Bot(
     token=settings.BOT_TOKEN,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
+bot_instance.session.middleware(send_scheduler)
@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+NOTIFICATION = 1
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar('send_priority', default=INTERACTIVE)
+
+# expired per-chat entries are dropped once the table grows past this size
+CHAT_SLOTS_LIMIT = 10000
+
+# only new messages count against the per-chat limit, edits, deletes and callback answers share the global bucket
+SENDING_METHODS = frozenset({
+    'sendMessage', 'sendPhoto', 'sendMediaGroup', 'sendDocument', 'sendVideo', 'sendAnimation', 'sendAudio',
+    'sendVoice', 'sendVideoNote', 'sendSticker', 'sendLocation', 'sendVenue', 'sendContact', 'sendPoll',
+    'sendDice', 'copyMessage', 'copyMessages', 'forwardMessage', 'forwardMessages'
+})
+
+
+@contextmanager
+def notification():
+    token = _priority.set(NOTIFICATION)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class SendScheduler(BaseRequestMiddleware):
+    def __init__(self, rate: float, chat_interval: float, chat_burst: int, max_retries: int):
+        self._rate = rate
+        self._chat_interval = chat_interval
+        self._chat_tolerance = chat_interval * (chat_burst - 1)
+        self._max_retries = max_retries
+        self._tokens = rate
+        self._updated_at = time.monotonic()
+        self._chat_slots: Dict[int, float] = {}
+        self._notifications_paused: Dict[int, float] = {}
+        self._waiters: Optional[asyncio.PriorityQueue] = None
+        self._order = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, 'chat_id', None)
+        paced = chat_id is not None and method.__api_method__ in SENDING_METHODS
+
+        priority = _priority.get()
+        for attempt in range(self._max_retries + 1):
+            if paced:
+                if priority == NOTIFICATION:
+                    await self._wait_notification_pause(chat_id)
+                await self._wait_chat_slot(chat_id)
+            await self._acquire(priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self._max_retries:
+                    raise
+                logger.warning(
+                    f"Telegram ограничил запрос {method.__api_method__} в чат {chat_id}, повтор через {e.retry_after} с "
+                    f"(попытка {attempt + 1} из {self._max_retries})"
+                )
+                if paced:
+                    self._back_off(chat_id, e.retry_after)
+                else:
+                    await asyncio.sleep(e.retry_after)
+
+    def _back_off(self, chat_id: int, retry_after: float):
+        resume_at = time.monotonic() + retry_after
+        self._chat_slots[chat_id] = max(self._chat_slots.get(chat_id, 0.0), resume_at + self._chat_tolerance)
+        # notifications to this chat sit out the whole retry_after before taking a slot, so replies get the first ones
+        self._notifications_paused[chat_id] = max(self._notifications_paused.get(chat_id, 0.0), resume_at)
+        if len(self._notifications_paused) > CHAT_SLOTS_LIMIT:
+            now = time.monotonic()
+            self._notifications_paused = {chat: until for chat, until in self._notifications_paused.items() if until > now}
+
+    async def _wait_notification_pause(self, chat_id: int):
+        now = time.monotonic()
+        resume_at = self._notifications_paused.get(chat_id)
+        if resume_at is None:
+            return
+        if resume_at <= now:
+            del self._notifications_paused[chat_id]
+            return
+        await asyncio.sleep(resume_at - now)
+
+    async def _wait_chat_slot(self, chat_id: int):
+        # GCRA: a chat may run chat_burst messages ahead of its pace, then waits one interval per message
+        now = time.monotonic()
+        slot = max(now, self._chat_slots.get(chat_id, 0.0))
+        self._chat_slots[chat_id] = slot + self._chat_interval
+        if len(self._chat_slots) > CHAT_SLOTS_LIMIT:
+            self._chat_slots = {chat: next_slot for chat, next_slot in self._chat_slots.items() if next_slot > now}
+        delay = slot - now - self._chat_tolerance
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _acquire(self, priority: int):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._waiters = asyncio.PriorityQueue()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._waiters.put((priority, next(self._order), future))
+        await future
+
+    async def _dispatch(self):
+        while True:
+            _, _, future = await self._waiters.get()
+            if future.done():
+                continue
+            await self._take_token()
+            if not future.done():
+                future.set_result(None)
+
+    async def _take_token(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self._rate, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    async def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+
+send_scheduler = SendScheduler(
+    rate=settings.TELEGRAM_GLOBAL_RATE,
+    chat_interval=settings.TELEGRAM_CHAT_INTERVAL,
+    chat_burst=settings.TELEGRAM_CHAT_BURST,
+    max_retries=settings.TELEGRAM_MAX_RETRIES
+)
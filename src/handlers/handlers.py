@@ -1,23 +1,78 @@
 from aiogram.types import Message, CallbackQuery, Union, BufferedInputFile
 from aiogram.fsm.context import FSMContext
-from sqlalchemy.orm import selectinload
 
 from templates import keyboards, texts, constants
 from states.states import RegistrationState, EditProfileState, PreferenceState, MeetingState
-from storage.s3_yandex import upload_photo_to_s3, get_photo_with_cache
-from storage.db import async_session
-from sqlalchemy import select
-from model.models import User, Preference
+from storage.s3_yandex import upload_photo_to_s3, get_photo_with_cache, schedule_photo_prefetch
+from src.storage.redis_client import photo_cache
+from src.storage.images import InvalidPhotoError
+from src.storage.profile_cards import profile_card_cache
+from src.storage.preferences_cache import preferences_cache
+from aiogram.exceptions import TelegramBadRequest
+from functools import partial
+from src.storage.db import async_session
+from sqlalchemy import select, tuple_, union_all
+from src.model.models import User, Match
+from datetime import datetime
+from typing import Awaitable, Callable, Optional, Set, Tuple
 from src.storage import rabbit
-import aio_pika
-import msgpack
-from config.settings import settings
+import asyncio
 from core.bot_instance import bot_instance
+from core.send_scheduler import notification
 import logging
 
 
 logger = logging.getLogger(__name__)
 
+_notification_tasks: Set[asyncio.Task] = set()
+
+
+async def _send_notification(chat_id: int, text: str):
+    try:
+        with notification():
+            await bot_instance.send_message(chat_id=chat_id, text=text)
+    except Exception as e:
+        logger.error(f"Не удалось отправить уведомление в чат {chat_id}: {str(e)}")
+
+
+def schedule_notification(chat_id: int, text: str):
+    # a throttled notification must not hold up the reply to the user who triggered it
+    task = asyncio.create_task(_send_notification(chat_id, text))
+    _notification_tasks.add(task)
+    task.add_done_callback(_notification_tasks.discard)
+
+
+async def drain_notifications():
+    if _notification_tasks:
+        logger.info(f"Ожидание отправки {len(_notification_tasks)} уведомлений")
+        await asyncio.gather(*_notification_tasks, return_exceptions=True)
+
+
+async def send_profile_photo(send: Callable[..., Awaitable[Message]], photo_url: str, **kwargs) -> Message:
+    try:
+        file_id = await photo_cache.get_file_id(photo_url)
+    except Exception:
+        file_id = None
+
+    if file_id:
+        try:
+            return await send(photo=file_id, **kwargs)
+        except TelegramBadRequest as e:
+            logger.warning(f"Сохраненный file_id для фото {photo_url} не принят Telegram: {str(e)}")
+            await photo_cache.drop_file_id(photo_url)
+
+    # a prefetched photo is uploaded from memory instead of making Telegram download it from S3
+    photo_data = photo_cache.local.peek_prefetched(photo_url)
+    photo = BufferedInputFile(file=photo_data, filename="profile.jpg") if photo_data else photo_url
+    message = await send(photo=photo, **kwargs)
+    if message.photo:
+        try:
+            await photo_cache.cache_file_id(photo_url, message.photo[-1].file_id)
+        except Exception:
+            pass
+    return message
+
+
 async def start(msg: Message):
     if not msg.from_user:
         logger.warning(f"Не удалось получить данные пользователя в сообщении: {msg}")
@@ -29,24 +84,7 @@ async def start(msg: Message):
     request_body = {'user_id': user_id, 'action': 'check_user_in_db'}
     
     try:
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('user_check', aio_pika.ExchangeType.TOPIC, durable=True)
-
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_id), durable=True)
-
-            user_queue = await channel.declare_queue('user_messages', durable=True)
-
-            await user_queue.bind(exchange, 'user_messages')
-
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_id))
-
-            await exchange.publish(aio_pika.Message(body=msgpack.packb(request_body)), routing_key='user_messages')
-
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break
+        response = await rabbit.rpc_client.call('user_check', request_body, persistent=False)
         
         if response.get('exists'):
             logger.info(f"Пользователь {user_id} уже зарегистрирован")
@@ -170,14 +208,11 @@ async def get_photo(msg: Message, state: FSMContext):
         file = await msg.bot.get_file(photo.file_id)
         file_data = await msg.bot.download_file(file.file_path)
         
-        if not file.file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-            logger.warning(f"Пользователь {user_id} отправил фото в недопустимом формате: {file.file_path}")
+        try:
+            s3_url = await upload_photo_to_s3(file=file_data.read())
+        except InvalidPhotoError as e:
+            logger.warning(f"Пользователь {user_id} отправил фото в недопустимом формате: {str(e)}")
             return await msg.answer(await texts.error_photo_phormat())
-
-        s3_url = await upload_photo_to_s3(
-            file=file_data.read(),
-            filename=file.file_path.split("/")[-1]
-        )
         logger.info(f"Фото пользователя {user_id} успешно загружено в S3: {s3_url}")
 
         await state.update_data(photo=s3_url)
@@ -185,26 +220,19 @@ async def get_photo(msg: Message, state: FSMContext):
         
         photo_data = await get_photo_with_cache(s3_url)
 
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('user_actions', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_id))
-            await user_queue.bind(exchange, routing_key='user_messages')
-
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb({
-                        'action': 'create_user_profile',
-                        'user_id': user_id,
-                        'tg_username': msg.from_user.username,
-                        'user_data': user_data
-                    })
-                ),
-                routing_key='user_messages'
-            )
-            logger.info(f"Данные пользователя {user_id} отправлены в очередь")
+        request_body = {
+            'action': 'create_user_profile',
+            'user_id': user_id,
+            'tg_username': msg.from_user.username,
+            'user_data': user_data
+        }
+
+        # the profile has to exist before the user can press anything in the main menu
+        response = await rabbit.rpc_client.call('user_actions', request_body)
+        if response.get('status') != 'success':
+            logger.error(f"Не удалось зарегистрировать пользователя {user_id}: {response.get('error')}")
+            return await msg.answer("Произошла ошибка при регистрации, отправьте фото еще раз")
+        logger.info(f"Профиль пользователя {user_id} создан")
 
         await msg.answer(await texts.success())
         if photo_data:
@@ -258,32 +286,12 @@ async def update_user_preferences_rabbit(user_tg_id: int, data: dict):
     }
     
     try:
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('preferences_updates', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_tg_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
+        response = await rabbit.rpc_client.call('preferences_updates', request_body)
 
-            await user_queue.bind(exchange, 'user_messages')
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_tg_id))
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(request_body),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key='user_messages'
-            )
-            
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break
-                    
-            if response.get('user_tg_id') == user_tg_id:
-                logger.info(f"Предпочтения пользователя {user_tg_id} успешно обновлены")
-                return response
+        if response.get('user_tg_id') == user_tg_id:
+            logger.info(f"Предпочтения пользователя {user_tg_id} успешно обновлены")
+            preferences_cache.evict(user_tg_id)
+            return response
     except Exception as e:
         logger.error(f"Ошибка при обновлении предпочтений пользователя {user_tg_id}: {str(e)}")
         raise
@@ -299,35 +307,15 @@ async def send_profile_update(user_tg_id: int, update_data: dict, action_type: s
     }
 
     try:
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('profile_updates', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_tg_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
+        response = await rabbit.rpc_client.call('profile_updates', request_body)
 
-            await user_queue.bind(exchange, 'user_messages')
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_tg_id))
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(request_body),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key='user_messages'
-            )
-            
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break
-                    
-            if response['status'] == 'success':
-                logger.info(f"Профиль пользователя {user_tg_id} успешно обновлен")
-                return True
-            else:
-                logger.warning(f"Не удалось обновить профиль пользователя {user_tg_id}")
-                return False
+        if response['status'] == 'success':
+            logger.info(f"Профиль пользователя {user_tg_id} успешно обновлен")
+            profile_card_cache.evict(user_tg_id)
+            return True
+        else:
+            logger.warning(f"Не удалось обновить профиль пользователя {user_tg_id}")
+            return False
     except Exception as e:
         logger.error(f"Ошибка при обновлении профиля пользователя {user_tg_id}: {str(e)}")
         return False
@@ -354,15 +342,7 @@ async def save_min_age(msg: Message, state: FSMContext):
     
     try:
         async with async_session() as session:
-            user_result = await session.execute(
-                select(User.id).where(User.tg_id == user_id)
-            )
-            user_id_db = user_result.scalar_one()
-
-            prefs = await session.execute(
-                select(Preference).where(Preference.user_id == user_id_db)
-            )
-            prefs = prefs.scalar_one()
+            prefs = await preferences_cache.load(session, user_id)
 
             if hasattr(prefs, 'max_age') and min_age > prefs.max_age:
                 logger.warning(f"Пользователь {user_id} ввел минимальный возраст больше максимального: {min_age} > {prefs.max_age}")
@@ -398,15 +378,7 @@ async def save_max_age(msg: Message, state: FSMContext):
     
     try:
         async with async_session() as session:
-            user_result = await session.execute(
-                select(User.id).where(User.tg_id == user_id)
-            )
-            user_id_db = user_result.scalar_one()
-            
-            prefs = await session.execute(
-                select(Preference).where(Preference.user_id == user_id_db)
-            )
-            prefs = prefs.scalar_one()
+            prefs = await preferences_cache.load(session, user_id)
             
             if hasattr(prefs, 'min_age') and max_age < prefs.min_age:
                 logger.warning(f"Пользователь {user_id} ввел максимальный возраст меньше минимального: {max_age} < {prefs.min_age}")
@@ -442,15 +414,7 @@ async def save_min_rating(msg: Message, state: FSMContext):
     
     try:
         async with async_session() as session:
-            user_result = await session.execute(
-                select(User.id).where(User.tg_id == user_id)
-            )
-            user_id_db = user_result.scalar_one()
-
-            prefs = await session.execute(
-                select(Preference).where(Preference.user_id == user_id_db)
-            )
-            prefs = prefs.scalar_one()
+            prefs = await preferences_cache.load(session, user_id)
 
             if hasattr(prefs, 'max_rating') and min_rating > prefs.max_rating:
                 logger.warning(f"Пользователь {user_id} ввел минимальный рейтинг больше максимального: {min_rating} > {prefs.max_rating}")
@@ -486,15 +450,7 @@ async def save_max_rating(msg: Message, state: FSMContext):
     
     try:
         async with async_session() as session:
-            user_result = await session.execute(
-                select(User.id).where(User.tg_id == user_id)
-            )
-            user_id_db = user_result.scalar_one()
-            
-            prefs = await session.execute(
-                select(Preference).where(Preference.user_id == user_id_db)
-            )
-            prefs = prefs.scalar_one()
+            prefs = await preferences_cache.load(session, user_id)
             
             if hasattr(prefs, 'min_rating') and max_rating < prefs.min_rating:
                 logger.warning(f"Пользователь {user_id} ввел максимальный рейтинг меньше минимального: {max_rating} < {prefs.min_rating}")
@@ -524,24 +480,76 @@ async def show_rating(call: CallbackQuery):
     logger.info(f"Пользователь {user_id} запросил информацию о рейтинге")
 
     async with async_session() as session:
-        result = await session.execute(
-            select(User).where(User.tg_id == user_id)
-        )
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            logger.warning(f"Пользователь {user_id} не найден в базе при запросе рейтинга")
-            return await call.message.answer(await texts.error_questionnaire())
-        
-        text = await texts.rating_info(
-            user_rating=user.rating,
-            like_count=user.like_count,
-            dislike_count=user.dislike_count
-        )
-        
+        card = await profile_card_cache.load(session, user_id)
+
+    if not card:
+        logger.warning(f"Пользователь {user_id} не найден в базе при запросе рейтинга")
+        return await call.message.answer(await texts.error_questionnaire())
+
+    text = await texts.rating_info(
+        user_rating=card["rating"],
+        like_count=card["like_count"],
+        dislike_count=card["dislike_count"]
+    )
     await call.message.answer(text)
 
 
+MATCHES_PAGE_SIZE = 10
+MATCHES_CURSOR_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def _matches_page_query(tg_id: int, before: Optional[Tuple[datetime, int]], limit: int):
+    user_id = select(User.id).where(User.tg_id == tg_id).scalar_subquery()
+
+    # one index-ordered scan per side of the pair instead of an OR over both columns
+    sides = []
+    for own, partner in ((Match.user1_id, Match.user2_id), (Match.user2_id, Match.user1_id)):
+        side = select(Match.id, Match.matched_at, partner.label('partner_id')).where(own == user_id)
+        if before:
+            side = side.where(tuple_(Match.matched_at, Match.id) < tuple_(*before))
+        sides.append(side.order_by(Match.matched_at.desc(), Match.id.desc()).limit(limit))
+    page = union_all(*sides).subquery()
+
+    return (
+        select(page.c.id, page.c.matched_at, User.tg_username, User.firstname, User.lastname)
+        .join(User, User.id == page.c.partner_id)
+        .order_by(page.c.matched_at.desc(), page.c.id.desc())
+        .limit(limit)
+    )
+
+
+async def show_matches(call: CallbackQuery):
+    user_id = call.from_user.id
+    before = None
+    if call.data.startswith(f"{constants.MATCHES_PAGE_CALL}:"):
+        _, matched_at, match_id = call.data.split(':')
+        before = (datetime.strptime(matched_at, MATCHES_CURSOR_FORMAT), int(match_id))
+    logger.info(f"Пользователь {user_id} запросил список мэтчей, курсор: {before}")
+
+    async with async_session() as session:
+        result = await session.execute(_matches_page_query(user_id, before, MATCHES_PAGE_SIZE + 1))
+        rows = result.all()
+
+    if not rows:
+        await call.answer()
+        return await call.message.answer(
+            await texts.no_matches(),
+            reply_markup=await keyboards.back_to_menu_keyboard()
+        )
+
+    page = rows[:MATCHES_PAGE_SIZE]
+    next_cursor = None
+    if len(rows) > MATCHES_PAGE_SIZE:
+        last = page[-1]
+        next_cursor = f"{last.matched_at.strftime(MATCHES_CURSOR_FORMAT)}:{last.id}"
+
+    await call.answer()
+    await call.message.answer(
+        await texts.matches_list([row._asdict() for row in page]),
+        reply_markup=await keyboards.matches_keyboard(next_cursor)
+    )
+
+
 # 1) Редактировать фото
 async def edit_photo(call: CallbackQuery, state: FSMContext):
     logger.info(f"Пользователь {call.from_user.id} начал редактирование фото")
@@ -590,22 +598,11 @@ async def edit_back(call: CallbackQuery, state: FSMContext):
     tg_id = call.from_user.id
 
     async with async_session() as session:
-        result = await session.execute(
-            select(User).options(selectinload(User.photo)).where(User.tg_id == tg_id)
-        )
-        user = result.scalar_one()
-        photo_url = user.photo.url
-
-        user_data = {
-            "full_name": f"{user.lastname} {user.firstname} {user.mname}",
-            "age": user.age,
-            "gender": user.gender,
-            "bio": user.bio,
-            "photo": photo_url
-        }
+        user_data = await profile_card_cache.load(session, tg_id)
 
-    await call.message.answer_photo(
-        photo=user_data["photo"],
+    await send_profile_photo(
+        call.message.answer_photo,
+        user_data["photo"],
         caption=await texts.summary(user_data),
         reply_markup=await keyboards.main_menu_keyboard()
     )
@@ -631,51 +628,33 @@ async def get_new_photo(msg: Message, state: FSMContext):
         file = await msg.bot.get_file(photo.file_id)
         file_data = await msg.bot.download_file(file.file_path)
         
-        if not file.file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-            logger.warning(f"Пользователь {user_id} отправил фото в недопустимом формате: {file.file_path}")
+        try:
+            s3_url = await upload_photo_to_s3(file=file_data.read())
+        except InvalidPhotoError as e:
+            logger.warning(f"Пользователь {user_id} отправил фото в недопустимом формате: {str(e)}")
             return await msg.answer(await texts.error_photo_phormat())
+        logger.info(f"Новое фото пользователя {user_id} загружено в S3: {s3_url}")
 
         request_body = {
             'user_tg_id': user_id,
-            'file_data': file_data.read(),
-            'filename': file.file_path.split("/")[-1],
+            'photo_url': s3_url,
             'action': 'update_photo'
         }
         
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('photo_updates', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
+        response = await rabbit.rpc_client.call('photo_updates', request_body)
 
-            await user_queue.bind(exchange, 'user_messages')
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_id))
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(request_body),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key='user_messages'
+        if response['status'] == 'success':
+            logger.info(f"Фото пользователя {user_id} успешно обновлено")
+            profile_card_cache.evict(user_id)
+            await msg.answer(await texts.updated_successfully())
+            await msg.answer(
+                await texts.edit_profile_text(),
+                reply_markup=await keyboards.edit_profile_keyboard()
             )
-            
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break
-                    
-            if response['status'] == 'success':
-                logger.info(f"Фото пользователя {user_id} успешно обновлено")
-                await msg.answer(await texts.updated_successfully())
-                await msg.answer(
-                    await texts.edit_profile_text(),
-                    reply_markup=await keyboards.edit_profile_keyboard()
-                )
-                await state.clear()
-            else:
-                logger.error(f"Ошибка при обновлении фото пользователя {user_id}")
-                await msg.answer("Ошибка при обработке фото")
+            await state.clear()
+        else:
+            logger.error(f"Ошибка при обновлении фото пользователя {user_id}")
+            await msg.answer("Ошибка при обработке фото")
     except Exception as e:
         logger.error(f"Ошибка при обработке нового фото пользователя {user_id}: {str(e)}")
         await msg.answer("Произошла ошибка, попробуйте позже")
@@ -920,48 +899,30 @@ async def get_all_new_photo(msg: Message, state: FSMContext):
         file = await msg.bot.get_file(photo.file_id)
         file_data = await msg.bot.download_file(file.file_path)
         
-        if not file.file_path.lower().endswith(('.jpg', '.jpeg', '.png')):
-            logger.warning(f"Пользователь {user_id} отправил фото в недопустимом формате (полное обновление): {file.file_path}")
+        try:
+            s3_url = await upload_photo_to_s3(file=file_data.read())
+        except InvalidPhotoError as e:
+            logger.warning(f"Пользователь {user_id} отправил фото в недопустимом формате (полное обновление): {str(e)}")
             return await msg.answer(await texts.error_photo_phormat())
+        logger.info(f"Новое фото пользователя {user_id} загружено в S3 (полное обновление): {s3_url}")
 
         request_body = {
             'user_tg_id': user_id,
-            'file_data': file_data.read(),
-            'filename': file.file_path.split("/")[-1],
+            'photo_url': s3_url,
             'action': 'update_photo',
             'full_update': True
         }
         
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('photo_updates', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
+        response = await rabbit.rpc_client.call('photo_updates', request_body)
 
-            await user_queue.bind(exchange, 'user_messages')
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_id))
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(request_body),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key='user_messages'
-            )
-            
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break
-
-            if response['status'] == 'success':
-                logger.info(f"Фото пользователя {user_id} успешно обновлено (полное обновление)")
-                await full_profile_update(msg, response['photo_url'])
-                await state.clear()
-            else:
-                logger.error(f"Ошибка при обновлении фото пользователя {user_id} (полное обновление)")
-                await msg.answer("Ошибка при обработке фото")
+        if response['status'] == 'success':
+            logger.info(f"Фото пользователя {user_id} успешно обновлено (полное обновление)")
+            profile_card_cache.evict(user_id)
+            await full_profile_update(msg, response['photo_url'])
+            await state.clear()
+        else:
+            logger.error(f"Ошибка при обновлении фото пользователя {user_id} (полное обновление)")
+            await msg.answer("Ошибка при обработке фото")
     except Exception as e:
         logger.error(f"Ошибка при обработке фото пользователя {user_id} (полное обновление): {str(e)}")
         await msg.answer("Произошла ошибка, попробуйте позже")
@@ -972,21 +933,13 @@ async def full_profile_update(msg: Message, photo_url: str):
     try:
         tg_id = msg.from_user.id
         async with async_session() as session:
-            result = await session.execute(select(User).options(selectinload(User.photo)).where(User.tg_id == tg_id))
-            user = result.scalar_one()
-            
-            user_data = {
-                "full_name": f"{user.lastname} {user.firstname} {user.mname}",
-                "age": user.age,
-                "gender": user.gender,
-                "bio": user.bio,
-                "photo": photo_url
-            }
+            user_data = await profile_card_cache.load(session, tg_id)
+        user_data["photo"] = photo_url
 
         await msg.answer(await texts.profile_updated_completely())
-        await msg.bot.send_photo(
-            chat_id=msg.chat.id,
-            photo=user_data["photo"],
+        await send_profile_photo(
+            partial(msg.bot.send_photo, chat_id=msg.chat.id),
+            user_data["photo"],
             caption=await texts.summary(user_data),
             reply_markup=await keyboards.main_menu_keyboard()
         )
@@ -1018,40 +971,24 @@ async def start_meeting(event: Union[CallbackQuery, Message], state: FSMContext)
     }
     
     try:
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('meeting_updates', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=from_user_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
+        response = await rabbit.rpc_client.call('meeting_updates', request_body)
 
-            await user_queue.bind(exchange, 'user_messages')
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=from_user_id))
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(request_body),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key='user_messages'
-            )
-            
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break 
-                
         if response['status'] == 'success':
             profile = response['profile']
             logger.info(f"Пользователю {from_user_id} показан профиль {profile.get('id')}")
             await state.set_state(MeetingState.viewing)
             await state.update_data(current_profile=profile)
             
-            await answer_photo(
-                photo=profile["photo"],
+            await send_profile_photo(
+                answer_photo,
+                profile["photo"],
                 caption=await texts.summary(profile),
                 reply_markup=await keyboards.meeting_keyboard()
             )
+            schedule_photo_prefetch(response.get('upcoming_photos', []))
+        elif response['status'] == 'not_found':
+            logger.warning(f"Профиль пользователя {from_user_id} не найден при старте встречи")
+            await answer_text(await texts.profile_not_found())
         else:
             logger.info(f"Для пользователя {from_user_id} не найдено подходящих профилей")
             await answer_text(
@@ -1087,28 +1024,7 @@ async def like_profile(call: CallbackQuery, state: FSMContext):
     }
     
     try:
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('likes_updates', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
-
-            await user_queue.bind(exchange, 'user_messages')
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_id))
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(request_body),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key='user_messages'
-            )
-            
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break
+        response = await rabbit.rpc_client.call('likes_updates', request_body)
 
         if response['status'] == 'success':
             logger.info(f"Лайк пользователя {user_id} для профиля {profile.get('id')} успешно сохранен")
@@ -1122,10 +1038,7 @@ async def like_profile(call: CallbackQuery, state: FSMContext):
                 second_user_username = from_user_data.get('tg_username')
                 
                 message = await texts.match_notification(second_user_username)
-                await bot_instance.send_message(
-                    chat_id=matched_user['tg_id'],
-                    text=message
-                )
+                schedule_notification(matched_user['tg_id'], message)
             await start_meeting(call, state)
         else:
             logger.error(f"Ошибка при сохранении лайка от пользователя {user_id} для профиля {profile.get('id')}")
@@ -1159,28 +1072,7 @@ async def dislike_profile(call: CallbackQuery, state: FSMContext):
     }
     
     try:
-        async with rabbit.channel_pool.acquire() as channel:
-            exchange = await channel.declare_exchange('likes_updates', aio_pika.ExchangeType.TOPIC, durable=True)
-            queue = await channel.declare_queue(settings.USER_QUEUE.format(user_id=user_id), durable=True)
-            user_queue = await channel.declare_queue('user_messages', durable=True)
-
-            await user_queue.bind(exchange, 'user_messages')
-            
-            await queue.bind(exchange, routing_key=settings.USER_QUEUE.format(user_id=user_id))
-            
-            await exchange.publish(
-                aio_pika.Message(
-                    body=msgpack.packb(request_body),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-                ),
-                routing_key='user_messages'
-            )
-            
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process():
-                        response = msgpack.unpackb(message.body)
-                        break
+        response = await rabbit.rpc_client.call('likes_updates', request_body)
 
         if response['status'] == 'success':
             logger.info(f"Дизлайк пользователя {user_id} для профиля {profile.get('id')} успешно сохранен")
@@ -1197,8 +1089,9 @@ async def dislike_profile(call: CallbackQuery, state: FSMContext):
 async def show_profile_again(msg: Message, state: FSMContext, profile: dict):
     user_id = msg.from_user.id
     logger.info(f"Повторный показ профиля {profile.get('id')} для пользователя {user_id}")
-    await msg.answer_photo(
-        photo=profile["photo"],
+    await send_profile_photo(
+        msg.answer_photo,
+        profile["photo"],
         caption=await texts.summary(profile),
         reply_markup=await keyboards.meeting_keyboard()
     )
@@ -15,6 +15,8 @@ user_router.message.register(handlers.get_bio, RegistrationState.waiting_for_bio
 user_router.message.register(handlers.get_photo, RegistrationState.waiting_for_photo)
 user_router.callback_query.register(handlers.preferences, F.data == constants.SET_PREFERENCES_CALL)
 user_router.callback_query.register(handlers.show_rating, F.data == constants.VIEW_RATING_CALL)
+user_router.callback_query.register(handlers.show_matches, F.data == constants.MY_MATCHES_CALL)
+user_router.callback_query.register(handlers.show_matches, F.data.startswith(f"{constants.MATCHES_PAGE_CALL}:"))
 user_router.callback_query.register(handlers.edit_profile, F.data == constants.EDIT_PROFILE_CALL)
 user_router.callback_query.register(handlers.edit_photo, F.data == constants.EDIT_PHOTO_CALL)
 user_router.callback_query.register(handlers.edit_full_name, F.data == constants.EDIT_NAME_CALL)
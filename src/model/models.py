@@ -1,9 +1,10 @@
+import random
 from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy import (
-    BigInteger, Boolean, CheckConstraint, ForeignKey, Integer, Numeric,
-    String, TIMESTAMP, UniqueConstraint
+    BigInteger, Boolean, CheckConstraint, Float, ForeignKey, Index, Integer, Numeric,
+    String, TIMESTAMP, UniqueConstraint, func, text
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -26,6 +27,8 @@ class User(Base):
     like_count: Mapped[int] = mapped_column(Integer, default=0)
     dislike_count: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP, default=datetime.utcnow)
+    random_key: Mapped[float] = mapped_column(Float, default=random.random, server_default=func.random(), nullable=False, index=True)
+    profile_version: Mapped[int] = mapped_column(Integer, default=0, server_default='0', nullable=False)
 
     photo: Mapped['Photo'] = relationship('Photo', back_populates='user', uselist=False, cascade='all, delete-orphan')
     preferences: Mapped['Preference'] = relationship('Preference', back_populates='user', uselist=False, cascade='all, delete-orphan')
@@ -34,6 +37,7 @@ class User(Base):
 
     __table_args__ = (
         CheckConstraint('age BETWEEN 10 AND 110', name='ck_users_age_range'),
+        Index('ix_users_gender_age_rating', 'gender', 'age', 'rating'),
     )
 
 
@@ -48,6 +52,19 @@ class Photo(Base):
     user: Mapped['User'] = relationship('User', back_populates='photo')
 
 
+class PhotoObject(Base):
+    __tablename__ = 'photo_objects'
+
+    url: Mapped[str] = mapped_column(String, primary_key=True)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    released_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        CheckConstraint('ref_count >= 0', name='ck_photo_objects_ref_count'),
+        Index('ix_photo_objects_released_at', 'released_at', postgresql_where=text('ref_count = 0')),
+    )
+
+
 class Preference(Base):
     __tablename__ = 'preferences'
 
@@ -79,6 +96,19 @@ class Like(Base):
     from_user: Mapped['User'] = relationship('User', foreign_keys=[from_user_id], back_populates='likes_given')
     to_user: Mapped['User'] = relationship('User', foreign_keys=[to_user_id], back_populates='likes_received')
 
+    __table_args__ = (
+        Index('ix_likes_to_user_id_is_like', 'to_user_id', 'is_like'),
+    )
+
+
+class UserRatingShard(Base):
+    __tablename__ = 'user_rating_shards'
+
+    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    likes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    dislikes: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
 
 class Match(Base):
     __tablename__ = 'matches'
@@ -90,4 +120,7 @@ class Match(Base):
 
     __table_args__ = (
         UniqueConstraint('user1_id', 'user2_id', name='uq_matches_user1_user2'),
+        CheckConstraint('user1_id < user2_id', name='ck_matches_user_order'),
+        Index('ix_matches_user1_id_matched_at', 'user1_id', 'matched_at', 'id'),
+        Index('ix_matches_user2_id_matched_at', 'user2_id', 'matched_at', 'id'),
     )
@@ -4,7 +4,6 @@ from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 import sys
 import os
 from config.settings import settings
-from src.model.meta import Base
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,16 +29,6 @@ def create_db_session(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
 engine = create_db_engine()
 async_session = create_db_session(engine)
 
-async def create_tables():
-    logger.info("Создание таблиц в БД")
-    try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Таблицы успешно созданы")
-    except Exception as e:
-        logger.error(f"Ошибка при создании таблиц: {str(e)}")
-        raise
-
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     logger.debug("Получение сессии БД")
     async with async_session() as session:
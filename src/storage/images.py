@@ -0,0 +1,88 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC_BYTES = {
+    'jpeg': b'\xff\xd8\xff',
+    'png': b'\x89PNG\r\n\x1a\n',
+    'webp': b'RIFF',
+}
+
+# refuse decompression bombs before Pillow allocates the full bitmap
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+
+class InvalidPhotoError(ValueError):
+    pass
+
+
+def detect_format(data: bytes) -> Optional[str]:
+    for image_format, signature in MAGIC_BYTES.items():
+        if data.startswith(signature):
+            if image_format == 'webp' and data[8:12] != b'WEBP':
+                continue
+            return image_format
+    return None
+
+
+def _encode(image: Image.Image, size: int, quality: int) -> bytes:
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    # saving without exif/icc drops every piece of metadata from the upload
+    variant.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _normalise(data: bytes) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return _encode(image, settings.PHOTO_DISPLAY_SIZE, settings.PHOTO_DISPLAY_QUALITY)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def start_image_pool():
+    global _executor
+    if _executor is None:
+        logger.info(f"Запуск пула обработки изображений на {settings.IMAGE_WORKERS} процессов")
+        # forked workers would inherit the event loop and open Redis/S3 sockets of the bot
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+
+def shutdown_image_pool():
+    global _executor
+    if _executor is not None:
+        logger.info("Остановка пула обработки изображений")
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def normalise_photo(data: bytes) -> bytes:
+    image_format = detect_format(data)
+    if image_format is None:
+        raise InvalidPhotoError("Файл не является изображением JPEG, PNG или WebP")
+
+    start_image_pool()
+    try:
+        photo = await asyncio.get_running_loop().run_in_executor(_executor, _normalise, data)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidPhotoError(f"Не удалось обработать изображение {image_format}: {str(e)}") from e
+
+    logger.debug(f"Фото {image_format} {len(data)} байт сжато до {len(photo)} байт")
+    return photo
@@ -0,0 +1,52 @@
+import logging
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from src.model.models import Preference
+from src.storage.local_cache import LocalCache
+from src.storage.user_ids import user_id_cache
+
+logger = logging.getLogger(__name__)
+
+
+class CachedPreferences(NamedTuple):
+    preferred_gender: str
+    min_age: int
+    max_age: int
+    min_rating: float
+    max_rating: float
+
+
+class PreferencesCache:
+    def __init__(self):
+        self.local: LocalCache[CachedPreferences] = LocalCache(
+            settings.PREFERENCES_LOCAL_SIZE, settings.PREFERENCES_LOCAL_TTL_SECONDS
+        )
+
+    async def load(self, session: AsyncSession, tg_id: int) -> CachedPreferences:
+        prefs = self.local.get(tg_id)
+        if prefs is not None:
+            return prefs
+
+        logger.debug(f"Предпочтения пользователя {tg_id} отсутствуют в кэше, загрузка из базы")
+        user_id = await user_id_cache.resolve(session, tg_id)
+        result = await session.execute(select(Preference).where(Preference.user_id == user_id))
+        row = result.scalar_one()
+        prefs = CachedPreferences(
+            preferred_gender=row.preferred_gender,
+            min_age=row.min_age,
+            max_age=row.max_age,
+            min_rating=float(row.min_rating),
+            max_rating=float(row.max_rating)
+        )
+        self.local.put(tg_id, prefs)
+        return prefs
+
+    def evict(self, tg_id: int):
+        self.local.evict(tg_id)
+
+
+preferences_cache = PreferencesCache()
@@ -0,0 +1,176 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import msgpack
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from src.storage.local_cache import LocalCache
+from src.model.models import Photo, User
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CARD_KEY = 'profile_card:{tg_id}'
+
+# a card only replaces an older version, so a writer that lost a race cannot put a stale profile back
+PUT_CARD_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '-1')
+if current > tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'card', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+def profile_card_query(tg_ids: Iterable[int]):
+    return (
+        select(
+            User.id, User.tg_id, User.tg_username, User.firstname, User.lastname, User.mname,
+            User.age, User.gender, User.bio, User.rating, User.like_count, User.dislike_count,
+            User.profile_version, Photo.url.label('photo')
+        )
+        .outerjoin(Photo, Photo.user_id == User.id)
+        .where(User.tg_id.in_(list(tg_ids)))
+    )
+
+
+def _card(row) -> dict:
+    return {
+        'id': row.id,
+        'tg_id': row.tg_id,
+        'tg_username': row.tg_username,
+        'firstname': row.firstname,
+        'lastname': row.lastname,
+        'mname': row.mname,
+        'full_name': f"{row.lastname} {row.firstname} {row.mname}",
+        'age': row.age,
+        'gender': row.gender,
+        'bio': row.bio,
+        'photo': row.photo,
+        'rating': float(row.rating or 0),
+        'like_count': row.like_count or 0,
+        'dislike_count': row.dislike_count or 0,
+        'version': row.profile_version
+    }
+
+
+class ProfileCardCache:
+    def __init__(self):
+        logger.info("Инициализация кэша карточек профилей")
+        self.redis = Redis.from_url(
+            settings.redis_url,
+            decode_responses=False
+        )
+        self._put_card = self.redis.register_script(PUT_CARD_SCRIPT)
+        # bot processes keep hot cards in memory, the invalidation bus evicts them when a profile changes
+        self.local: LocalCache[dict] = LocalCache(settings.PROFILE_CARD_LOCAL_SIZE, settings.PROFILE_CARD_LOCAL_TTL_SECONDS)
+
+    async def get(self, tg_id: int) -> Optional[dict]:
+        try:
+            card = await self.redis.hget(PROFILE_CARD_KEY.format(tg_id=tg_id), 'card')
+            return msgpack.unpackb(card) if card else None
+        except Exception as e:
+            logger.error(f"Ошибка при получении карточки профиля {tg_id}: {str(e)}")
+            raise
+
+    async def put(self, cards: List[dict]):
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for card in cards:
+                    await self._put_card(
+                        keys=[PROFILE_CARD_KEY.format(tg_id=card['tg_id'])],
+                        args=[card['version'], msgpack.packb(card), settings.PROFILE_CARD_TTL_SECONDS],
+                        client=pipe
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении карточек профилей: {str(e)}")
+            raise
+
+    async def refresh(self, session: AsyncSession, tg_ids: Iterable[int]) -> List[dict]:
+        tg_ids = list(tg_ids)
+        if not tg_ids:
+            return []
+        result = await session.execute(profile_card_query(tg_ids))
+        cards = [_card(row) for row in result.all()]
+        # the write in Postgres is already committed, a failed refresh leaves the old card until its TTL
+        try:
+            await self.put(cards)
+            logger.debug(f"Обновлено {len(cards)} карточек профилей")
+        except Exception:
+            pass
+        return cards
+
+    def evict(self, tg_id: int, version: Optional[int] = None):
+        card = self.local.get(tg_id)
+        if card is not None and (version is None or card['version'] < version):
+            self.local.evict(tg_id)
+
+    async def load(self, session: AsyncSession, tg_id: int) -> Optional[dict]:
+        card = self.local.get(tg_id)
+        if card is not None:
+            return dict(card)
+
+        try:
+            card = await self.get(tg_id)
+        except Exception:
+            card = None
+        if card is not None:
+            self.local.put(tg_id, card)
+            return dict(card)
+
+        logger.debug(f"Карточка профиля {tg_id} отсутствует в кэше, загрузка из базы")
+        result = await session.execute(profile_card_query([tg_id]))
+        row = result.one_or_none()
+        if row is None:
+            return None
+        card = _card(row)
+        self.local.put(tg_id, card)
+        try:
+            await self.put([card])
+        except Exception:
+            pass
+        return dict(card)
+
+    async def load_many(self, session: AsyncSession, tg_ids: Iterable[int]) -> Dict[int, dict]:
+        # reads Redis only, processes that do not listen to invalidation events must not serve cards from memory
+        tg_ids = list(tg_ids)
+        if not tg_ids:
+            return {}
+
+        cards = {}
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tg_id in tg_ids:
+                    pipe.hget(PROFILE_CARD_KEY.format(tg_id=tg_id), 'card')
+                packed = await pipe.execute()
+            cards = {tg_id: msgpack.unpackb(card) for tg_id, card in zip(tg_ids, packed) if card}
+        except Exception as e:
+            logger.error(f"Ошибка при получении карточек профилей: {str(e)}")
+
+        missing = [tg_id for tg_id in tg_ids if tg_id not in cards]
+        if missing:
+            logger.debug(f"Карточки профилей {missing} отсутствуют в кэше, загрузка из базы")
+            result = await session.execute(profile_card_query(missing))
+            loaded = [_card(row) for row in result.all()]
+            cards.update((card['tg_id'], card) for card in loaded)
+            try:
+                await self.put(loaded)
+            except Exception:
+                pass
+        return cards
+
+    async def close(self):
+        try:
+            logger.info("Закрытие соединения с Redis для карточек профилей")
+            await self.redis.close()
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии соединения с Redis: {str(e)}")
+            raise
+
+
+profile_card_cache = ProfileCardCache()
@@ -1,10 +1,20 @@
+import asyncio
+import logging
+import uuid
+import weakref
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
 import aio_pika
+import msgpack
 from aio_pika import Channel
-from aio_pika.abc import AbstractRobustConnection
+from aio_pika.abc import AbstractChannel, AbstractExchange, AbstractIncomingMessage, AbstractQueue, AbstractRobustConnection
 from aio_pika.pool import Pool
 
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 
 async def get_connection() -> AbstractRobustConnection:
     connection = await aio_pika.connect_robust(settings.rebbitmq_url)
@@ -19,4 +29,197 @@ async def get_channel() -> Channel:
         return await connection.channel()
 
 
-channel_pool: Pool = Pool(get_channel, max_size=10)
\ No newline at end of file
+channel_pool: Pool = Pool(get_channel, max_size=10)
+
+
+USER_MESSAGES_QUEUE = 'user_messages.{action_class}.{shard}'
+
+ACTION_CLASSES = {
+    'check_user_in_db': 'interactive',
+    'create_user_profile': 'interactive',
+    'get_next_profile': 'interactive',
+    'process_like': 'interactive',
+    'process_dislike': 'interactive',
+    'update_preferences': 'write',
+    'update_profile_field': 'write',
+    'update_photo': 'media',
+}
+
+DEFAULT_ACTION_CLASS = 'write'
+
+USER_KEY_FIELDS = ('user_id', 'user_tg_id', 'current_tg_id', 'from_user_tg_id')
+
+EXCHANGES = (
+    'user_check',
+    'user_actions',
+    'meeting_updates',
+    'likes_updates',
+    'photo_updates',
+    'profile_updates',
+    'preferences_updates',
+)
+
+INVALIDATION_EXCHANGE = 'cache_invalidation'
+
+
+class Topology:
+    def __init__(self):
+        self._exchanges: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    async def declare(self, channel: AbstractChannel) -> Dict[str, AbstractExchange]:
+        exchanges = self._exchanges.get(channel)
+        if exchanges is not None:
+            return exchanges
+
+        logger.info("Объявление топологии RabbitMQ для канала")
+        exchanges = {}
+        for name in EXCHANGES:
+            exchanges[name] = await channel.declare_exchange(name, aio_pika.ExchangeType.TOPIC, durable=True)
+
+        for action_class in set(ACTION_CLASSES.values()):
+            for shard in range(settings.CONSUMER_SHARDS):
+                queue_name = USER_MESSAGES_QUEUE.format(action_class=action_class, shard=shard)
+                queue = await channel.declare_queue(queue_name, durable=True)
+                for exchange in exchanges.values():
+                    await queue.bind(exchange, routing_key=queue_name)
+
+        # every bot process binds its own queue, so each event reaches all of them
+        exchanges[INVALIDATION_EXCHANGE] = await channel.declare_exchange(
+            INVALIDATION_EXCHANGE, aio_pika.ExchangeType.FANOUT, durable=True
+        )
+
+        self._exchanges[channel] = exchanges
+        return exchanges
+
+    async def get_exchange(self, channel: AbstractChannel, name: str) -> AbstractExchange:
+        exchanges = await self.declare(channel)
+        return exchanges[name]
+
+
+topology = Topology()
+
+
+def get_user_key(body: Dict[str, Any]) -> Optional[int]:
+    for field in USER_KEY_FIELDS:
+        value = body.get(field)
+        if value is not None:
+            return value
+    return None
+
+
+def key_hash(key: Any) -> int:
+    return zlib.crc32(str(key).encode())
+
+
+def shard_for_key(key: Any) -> int:
+    return key_hash(key) % settings.CONSUMER_SHARDS
+
+
+def routing_key_for(body: Dict[str, Any]) -> str:
+    action_class = ACTION_CLASSES.get(body.get('action'), DEFAULT_ACTION_CLASS)
+    return USER_MESSAGES_QUEUE.format(action_class=action_class, shard=shard_for_key(get_user_key(body)))
+
+
+class RpcClient:
+    def __init__(self):
+        self._channel: Optional[Channel] = None
+        self._callback_queue: Optional[AbstractQueue] = None
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._lock = asyncio.Lock()
+
+    async def connect(self):
+        async with self._lock:
+            if self._callback_queue is not None:
+                return
+            logger.info("Создание очереди ответов RPC")
+            self._channel = await get_channel()
+            await topology.declare(self._channel)
+            self._callback_queue = await self._channel.declare_queue(exclusive=True, auto_delete=True)
+            await self._callback_queue.consume(self._on_response, no_ack=True)
+            logger.info(f"Очередь ответов RPC создана: {self._callback_queue.name}")
+
+    async def _on_response(self, message: AbstractIncomingMessage):
+        future = self._futures.pop(message.correlation_id, None)
+        if future is None:
+            logger.warning(f"Получен ответ RPC с неизвестным correlation_id: {message.correlation_id}")
+            return
+        if not future.done():
+            future.set_result(msgpack.unpackb(message.body))
+
+    async def call(self, exchange_name: str, body: Dict[str, Any], persistent: bool = True) -> Dict[str, Any]:
+        await self.connect()
+
+        correlation_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._futures[correlation_id] = future
+
+        try:
+            async with channel_pool.acquire() as channel:
+                exchange = await topology.get_exchange(channel, exchange_name)
+                await exchange.publish(
+                    aio_pika.Message(
+                        body=msgpack.packb(body),
+                        correlation_id=correlation_id,
+                        reply_to=self._callback_queue.name,
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT if persistent else None
+                    ),
+                    routing_key=routing_key_for(body)
+                )
+
+            return await asyncio.wait_for(future, timeout=settings.RPC_TIMEOUT)
+        finally:
+            self._futures.pop(correlation_id, None)
+
+    async def close(self):
+        for future in self._futures.values():
+            if not future.done():
+                future.cancel()
+        self._futures.clear()
+        if self._channel is not None:
+            logger.info("Закрытие канала RPC")
+            await self._channel.close()
+        self._channel = None
+        self._callback_queue = None
+
+
+rpc_client = RpcClient()
+
+
+class InvalidationListener:
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._channel: Optional[Channel] = None
+        self._queue: Optional[AbstractQueue] = None
+        self._lock = asyncio.Lock()
+
+    def subscribe(self, event: str, handler: Callable[[Dict[str, Any]], None]):
+        self._handlers.setdefault(event, []).append(handler)
+
+    async def connect(self):
+        async with self._lock:
+            if self._queue is not None:
+                return
+            logger.info("Подписка на события инвалидации кэшей")
+            self._channel = await get_channel()
+            exchange = await topology.get_exchange(self._channel, INVALIDATION_EXCHANGE)
+            self._queue = await self._channel.declare_queue(exclusive=True, auto_delete=True)
+            await self._queue.bind(exchange)
+            await self._queue.consume(self._on_event, no_ack=True)
+
+    async def _on_event(self, message: AbstractIncomingMessage):
+        event = msgpack.unpackb(message.body)
+        for handler in self._handlers.get(event.get('event'), []):
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Ошибка обработки события инвалидации {event}: {str(e)}")
+
+    async def close(self):
+        if self._channel is not None:
+            logger.info("Закрытие канала событий инвалидации")
+            await self._channel.close()
+        self._channel = None
+        self._queue = None
+
+
+invalidation_listener = InvalidationListener()
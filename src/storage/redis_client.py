@@ -1,9 +1,62 @@
+from collections import Counter, OrderedDict
+from typing import Iterable, List
 from redis.asyncio import Redis
 from config.settings import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+class LocalPhotoCache:
+    # photo objects are never overwritten under the same URL, so entries only leave the cache by eviction
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # a single huge photo must not flush the whole cache
+        self.max_item_bytes = max_bytes // 8
+        self.size = 0
+        self.stats = Counter()
+        self._photos: OrderedDict[str, bytes] = OrderedDict()
+        self._prefetched: set[str] = set()
+
+    def get(self, photo_url: str) -> bytes | None:
+        photo_data = self._photos.get(photo_url)
+        if photo_data is None:
+            self.stats['misses'] += 1
+            return None
+        self._photos.move_to_end(photo_url)
+        self.stats['hits'] += 1
+        return photo_data
+
+    def put(self, photo_url: str, photo_data: bytes):
+        if len(photo_data) > self.max_item_bytes:
+            return
+        previous = self._photos.pop(photo_url, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._photos[photo_url] = photo_data
+        self.size += len(photo_data)
+        while self.size > self.max_bytes:
+            evicted_url, evicted = self._photos.popitem(last=False)
+            self._prefetched.discard(evicted_url)
+            self.size -= len(evicted)
+            self.stats['evictions'] += 1
+
+    def mark_prefetched(self, photo_urls: Iterable[str]):
+        self._prefetched.update(photo_url for photo_url in photo_urls if photo_url in self._photos)
+
+    def peek_prefetched(self, photo_url: str) -> bytes | None:
+        # sending a photo is not a cache lookup, so hit and miss counters are left alone
+        if photo_url not in self._prefetched:
+            return None
+        return self._photos.get(photo_url)
+
+    def __contains__(self, photo_url: str) -> bool:
+        return photo_url in self._photos
+
+    def __len__(self) -> int:
+        return len(self._photos)
+
+
 class PhotoCache:
     def __init__(self):
         logger.info("Инициализация кэша фотографий")
@@ -11,8 +64,11 @@ class PhotoCache:
             settings.redis_url,
             decode_responses=False
         )
+        self.local = LocalPhotoCache(settings.PHOTO_LOCAL_CACHE_BYTES)
+        self.redis_stats = Counter()
 
     async def cache_photo(self, photo_url: str, photo_data: bytes):
+        self.local.put(photo_url, photo_data)
         try:
             logger.debug(f"Кэширование фото по URL: {photo_url}")
             await self.redis.setex(
@@ -26,19 +82,100 @@ class PhotoCache:
             raise
 
     async def get_cached_photo(self, photo_url: str) -> bytes | None:
+        photo_data = self.local.get(photo_url)
+        if photo_data is not None:
+            return photo_data
+        return await self.get_remote_photo(photo_url)
+
+    async def get_remote_photo(self, photo_url: str) -> bytes | None:
         try:
             logger.debug(f"Получение фото из кэша: {photo_url}")
             photo_data = await self.redis.get(f"photo:{photo_url}")
             if photo_data:
                 logger.debug(f"Фото найдено в кэше: {photo_url}")
+                self.redis_stats['hits'] += 1
+                self.local.put(photo_url, photo_data)
             else:
                 logger.debug(f"Фото отсутствует в кэше: {photo_url}")
+                self.redis_stats['misses'] += 1
             return photo_data
         except Exception as e:
             logger.error(f"Ошибка при получении фото из кэша {photo_url}: {str(e)}")
             raise
 
+    async def warm_photos(self, photo_urls: List[str]) -> List[str]:
+        try:
+            cold = [photo_url for photo_url in photo_urls if photo_url not in self.local]
+            if not cold:
+                return []
+
+            # a photo with a file_id is sent by reference, its bytes are not needed
+            file_ids = await self.redis.mget([f"photo_file_id:{photo_url}" for photo_url in cold])
+            cold = [photo_url for photo_url, file_id in zip(cold, file_ids) if not file_id]
+            if not cold:
+                return []
+
+            missing = []
+            photos = await self.redis.mget([f"photo:{photo_url}" for photo_url in cold])
+            for photo_url, photo_data in zip(cold, photos):
+                if photo_data:
+                    self.redis_stats['hits'] += 1
+                    self.local.put(photo_url, photo_data)
+                else:
+                    self.redis_stats['misses'] += 1
+                    missing.append(photo_url)
+            return missing
+        except Exception as e:
+            logger.error(f"Ошибка при прогреве кэша фотографий: {str(e)}")
+            raise
+
+    async def cache_file_id(self, photo_url: str, file_id: str):
+        try:
+            logger.debug(f"Сохранение file_id для фото: {photo_url}")
+            await self.redis.setex(f"photo_file_id:{photo_url}", settings.FILE_ID_EXPIRE_SECONDS, file_id)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении file_id для фото {photo_url}: {str(e)}")
+            raise
+
+    async def get_file_id(self, photo_url: str) -> str | None:
+        try:
+            file_id = await self.redis.get(f"photo_file_id:{photo_url}")
+            return file_id.decode() if file_id else None
+        except Exception as e:
+            logger.error(f"Ошибка при получении file_id для фото {photo_url}: {str(e)}")
+            raise
+
+    async def drop_file_id(self, photo_url: str):
+        try:
+            await self.redis.delete(f"photo_file_id:{photo_url}")
+        except Exception as e:
+            logger.error(f"Ошибка при удалении file_id для фото {photo_url}: {str(e)}")
+            raise
+
+    async def stats(self) -> dict:
+        # Redis counts evicted and expired keys for the whole instance, not only photo keys
+        info = await self.redis.info('stats')
+        return {
+            'local': {
+                'hits': self.local.stats['hits'],
+                'misses': self.local.stats['misses'],
+                'evictions': self.local.stats['evictions'],
+                'photos': len(self.local),
+                'bytes': self.local.size
+            },
+            'redis': {
+                'hits': self.redis_stats['hits'],
+                'misses': self.redis_stats['misses'],
+                'server_evictions': info.get('evicted_keys', 0),
+                'server_expirations': info.get('expired_keys', 0)
+            }
+        }
+
     async def close(self):
+        try:
+            logger.info(f"Статистика кэша фотографий: {await self.stats()}")
+        except Exception as e:
+            logger.error(f"Ошибка при получении статистики кэша фотографий: {str(e)}")
         try:
             logger.info("Закрытие соединения с Redis")
             await self.redis.close()
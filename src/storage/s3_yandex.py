@@ -1,65 +1,243 @@
+import asyncio
 import aioboto3
-import uuid
+import hashlib
 import aiohttp
+from aiobotocore.config import AioConfig
+from botocore.exceptions import ClientError
+from contextlib import AsyncExitStack
+from datetime import datetime
+from sqlalchemy import case, delete, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from config.settings import settings
+from src.model.models import PhotoObject
+from src.storage.db import async_session
 from src.storage.redis_client import photo_cache
-from typing import Optional
+from src.storage.images import normalise_photo
+from typing import Dict, List, Optional, Set
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def upload_photo_to_s3(file: bytes, filename: str) -> str:
+
+class S3Storage:
+    def __init__(self):
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._s3 = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(settings.S3_MAX_CONCURRENCY)
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._lock:
+            if self._exit_stack is not None:
+                return
+            logger.info("Создание клиентов S3 и HTTP")
+            exit_stack = AsyncExitStack()
+            self._s3 = await exit_stack.enter_async_context(
+                aioboto3.Session().client(
+                    "s3",
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.REGION_NAME,
+                    endpoint_url=settings.ENDPOINT_URL,
+                    config=AioConfig(
+                        max_pool_connections=settings.S3_MAX_CONNECTIONS,
+                        tcp_keepalive=True,
+                        connect_timeout=settings.S3_TIMEOUT,
+                        read_timeout=settings.S3_TIMEOUT
+                    ),
+                )
+            )
+            self._http = await exit_stack.enter_async_context(
+                aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=settings.S3_MAX_CONNECTIONS,
+                        ttl_dns_cache=300,
+                        keepalive_timeout=60
+                    ),
+                    timeout=aiohttp.ClientTimeout(total=settings.S3_TIMEOUT)
+                )
+            )
+            self._exit_stack = exit_stack
+
+    async def put_object(self, object_key: str, body: bytes, content_type: str = 'image/jpeg') -> str:
+        await self.start()
+        async with self._semaphore:
+            await self._s3.put_object(Bucket=settings.BUCKET_NAME, Key=object_key, Body=body, ContentType=content_type)
+        return object_url(object_key)
+
+    async def object_exists(self, object_key: str) -> bool:
+        await self.start()
+        async with self._semaphore:
+            try:
+                await self._s3.head_object(Bucket=settings.BUCKET_NAME, Key=object_key)
+            except ClientError as e:
+                if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                    return False
+                raise
+        return True
+
+    async def delete_objects(self, object_keys: List[str]):
+        await self.start()
+        async with self._semaphore:
+            response = await self._s3.delete_objects(
+                Bucket=settings.BUCKET_NAME,
+                Delete={'Objects': [{'Key': key} for key in object_keys], 'Quiet': True}
+            )
+        errors = response.get('Errors', [])
+        if errors:
+            raise RuntimeError(f"Не удалось удалить {len(errors)} объектов S3, например {errors[0]}")
+
+    async def fetch(self, url: str) -> Optional[bytes]:
+        await self.start()
+        async with self._semaphore:
+            async with self._http.get(url) as resp:
+                if resp.status != 200:
+                    logger.warning(f"Не удалось загрузить фото {url}, статус: {resp.status}")
+                    return None
+                return await resp.read()
+
+    async def close(self):
+        async with self._lock:
+            if self._exit_stack is None:
+                return
+            logger.info("Закрытие клиентов S3 и HTTP")
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self._s3 = None
+            self._http = None
+
+
+s3_storage = S3Storage()
+
+
+AVATARS_PREFIX = 'avatars/'
+
+
+def object_url(object_key: str) -> str:
+    return f"{settings.ENDPOINT_URL}/{settings.BUCKET_NAME}/{object_key}"
+
+
+def object_key_from_url(photo_url: str) -> str:
+    return photo_url.removeprefix(f"{settings.ENDPOINT_URL}/{settings.BUCKET_NAME}/")
+
+
+async def _register_upload(photo_url: str) -> bool:
+    # every upload is recorded before the object is written, the sweep collects it if registration never references it;
+    # a released photo gets a fresh released_at, so the sweep cannot collect it before the new owner references it,
+    # and a row the sweep is collecting right now is gone once the upsert gets it, so the photo is uploaded again
+    now = datetime.utcnow()
+    async with async_session() as session:
+        result = await session.execute(
+            insert(PhotoObject)
+            .values(url=photo_url, ref_count=0, released_at=now)
+            .on_conflict_do_update(
+                index_elements=[PhotoObject.url],
+                set_={'released_at': case((PhotoObject.ref_count == 0, now), else_=PhotoObject.released_at)}
+            )
+            .returning(literal_column('xmax = 0').label('inserted'))
+        )
+        inserted = result.scalar_one()
+        await session.commit()
+    return inserted
+
+
+async def _forget_upload(photo_url: str):
+    # a failed upload must not leave a row that makes the next attempt skip the upload
     try:
-        logger.info(f"Начало загрузки фото в S3: {filename}")
-        session = aioboto3.Session()
-        object_key = f"avatars/{uuid.uuid4()}_{filename}"
+        async with async_session() as session:
+            await session.execute(
+                delete(PhotoObject).where(PhotoObject.url == photo_url, PhotoObject.ref_count == 0)
+            )
+            await session.commit()
+    except Exception as e:
+        logger.error(f"Ошибка при удалении записи о незагруженном фото {photo_url}: {str(e)}")
+
+
+async def upload_photo_to_s3(file: bytes) -> str:
+    try:
+        # the key is the hash of the uploaded bytes, so the same picture sent again is stored once
+        object_key = f"{AVATARS_PREFIX}{hashlib.sha256(file).hexdigest()}.jpg"
+        if not await _register_upload(object_url(object_key)):
+            logger.info(f"Фото уже загружено в S3, повторная загрузка пропущена: {object_key}")
+            return object_url(object_key)
+
+        try:
+            photo = await normalise_photo(file)
+            logger.info(f"Начало загрузки фото в S3: {object_key}")
+            photo_url = await s3_storage.put_object(object_key, photo)
+        except Exception:
+            await _forget_upload(object_url(object_key))
+            raise
+        logger.info(f"Фото успешно загружено в S3: {photo_url}")
         
-        async with session.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.REGION_NAME,
-            endpoint_url=settings.ENDPOINT_URL,
-        ) as s3:
-            await s3.put_object(Bucket=settings.BUCKET_NAME, Key=object_key, Body=file)
-            photo_url = f"{settings.ENDPOINT_URL}/{settings.BUCKET_NAME}/{object_key}"
-
-            logger.info(f"Фото успешно загружено в S3: {photo_url}")
-            
-            try:
-                await photo_cache.cache_photo(photo_url, file)
-                logger.debug(f"Фото закэшировано: {photo_url}")
-            except Exception as e:
-                logger.error(f"Ошибка кэширования фото {photo_url}: {str(e)}")
-            
-            return photo_url
+        try:
+            await photo_cache.cache_photo(photo_url, photo)
+            logger.debug(f"Фото закэшировано: {photo_url}")
+        except Exception as e:
+            logger.error(f"Ошибка кэширования фото {photo_url}: {str(e)}")
+        
+        return photo_url
             
     except Exception as e:
         logger.error(f"Ошибка загрузки фото в S3: {str(e)}")
         raise
 
+_photo_loads: Dict[str, asyncio.Future] = {}
+_prefetch_tasks: Set[asyncio.Task] = set()
+
+
 async def get_photo_with_cache(photo_url: str) -> Optional[bytes]:
+    photo_data = photo_cache.local.get(photo_url)
+    if photo_data is not None:
+        return photo_data
+
+    # concurrent misses for the same photo wait for one Redis/S3 round trip instead of starting their own
+    load = _photo_loads.get(photo_url)
+    if load is None:
+        load = asyncio.ensure_future(_load_photo(photo_url))
+        _photo_loads[photo_url] = load
+        load.add_done_callback(lambda _: _photo_loads.pop(photo_url, None))
+    return await asyncio.shield(load)
+
+
+async def _load_photo(photo_url: str) -> Optional[bytes]:
     try:
         logger.debug(f"Попытка получить фото из кэша: {photo_url}")
-        cached_photo = await photo_cache.get_cached_photo(photo_url)
+        cached_photo = await photo_cache.get_remote_photo(photo_url)
         if cached_photo:
             logger.debug(f"Фото получено из кэша: {photo_url}")
             return cached_photo
 
         logger.debug(f"Фото отсутствует в кэше, загрузка из S3: {photo_url}")
-        async with aiohttp.ClientSession() as session:
-            async with session.get(photo_url) as resp:
-                if resp.status == 200:
-                    photo_data = await resp.read()
-                    try:
-                        await photo_cache.cache_photo(photo_url, photo_data)
-                        logger.debug(f"Фото загружено из S3 и закэшировано: {photo_url}")
-                    except Exception as e:
-                        logger.error(f"Ошибка кэширования загруженного фото {photo_url}: {str(e)}")
-                    return photo_data
-                else:
-                    logger.warning(f"Не удалось загрузить фото {photo_url}, статус: {resp.status}")
-                    return None
+        photo_data = await s3_storage.fetch(photo_url)
+        if photo_data is None:
+            return None
+        try:
+            await photo_cache.cache_photo(photo_url, photo_data)
+            logger.debug(f"Фото загружено из S3 и закэшировано: {photo_url}")
+        except Exception as e:
+            logger.error(f"Ошибка кэширования загруженного фото {photo_url}: {str(e)}")
+        return photo_data
     except Exception as e:
         logger.error(f"Ошибка получения фото {photo_url}: {str(e)}")
         return None
+
+
+async def prefetch_photos(photo_urls: List[str]):
+    try:
+        missing = await photo_cache.warm_photos(photo_urls)
+        # S3 downloads are bounded by the storage semaphore and shared with concurrent readers
+        await asyncio.gather(*(get_photo_with_cache(photo_url) for photo_url in missing))
+        photo_cache.local.mark_prefetched(photo_urls)
+        logger.debug(f"Предзагружено {len(photo_urls)} фото, из S3 загружено {len(missing)}")
+    except Exception as e:
+        logger.warning(f"Ошибка предзагрузки фото: {str(e)}")
+
+
+def schedule_photo_prefetch(photo_urls: List[str]):
+    if not photo_urls:
+        return
+    task = asyncio.create_task(prefetch_photos(photo_urls))
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
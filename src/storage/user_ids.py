@@ -0,0 +1,64 @@
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from src.storage.local_cache import LocalCache
+from src.model.models import User
+
+logger = logging.getLogger(__name__)
+
+USER_IDS_KEY = 'user_ids'
+
+
+class UserIdCache:
+    # users are never deleted and tg_id never changes, so a resolved id is valid forever
+    def __init__(self, max_entries: int):
+        logger.info("Инициализация кэша идентификаторов пользователей")
+        self.redis = Redis.from_url(
+            settings.redis_url,
+            decode_responses=False
+        )
+        self.local: LocalCache[int] = LocalCache(max_entries)
+
+    async def remember(self, tg_id: int, user_id: int):
+        self.local.put(tg_id, user_id)
+        try:
+            await self.redis.hset(USER_IDS_KEY, str(tg_id), user_id)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении id пользователя {tg_id}: {str(e)}")
+
+    async def resolve(self, session: AsyncSession, tg_id: int) -> Optional[int]:
+        user_id = self.local.get(tg_id)
+        if user_id is not None:
+            return user_id
+
+        try:
+            user_id = await self.redis.hget(USER_IDS_KEY, str(tg_id))
+        except Exception as e:
+            logger.error(f"Ошибка при получении id пользователя {tg_id} из Redis: {str(e)}")
+            user_id = None
+        if user_id is not None:
+            user_id = int(user_id)
+            self.local.put(tg_id, user_id)
+            return user_id
+
+        # unknown tg_ids are not cached, the user may register a moment later
+        result = await session.execute(select(User.id).where(User.tg_id == tg_id))
+        user_id = result.scalar_one_or_none()
+        if user_id is not None:
+            await self.remember(tg_id, user_id)
+        return user_id
+
+    async def close(self):
+        try:
+            await self.redis.close()
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии соединения с Redis: {str(e)}")
+            raise
+
+
+user_id_cache = UserIdCache(settings.USER_ID_CACHE_SIZE)
@@ -14,6 +14,10 @@ EDIT_PROFILE_CALL = "edit_profile"
 EDIT_PROFILE_BUTTON = "3️⃣ Редактировать свой профиль"
 VIEW_RATING_CALL = "view_rating"
 VIEW_RATING_BUTTON = "4️⃣ Посмотреть свой рейтинг"
+MY_MATCHES_CALL = "my_matches"
+MY_MATCHES_BUTTON = "5️⃣ Мои мэтчи"
+MATCHES_PAGE_CALL = "matches_page"
+MATCHES_NEXT_BUTTON = "Ещё мэтчи ▶️"
 
 MIN_AGE_CALL = "min_age"
 MIN_AGE_BUTTON = "Минимальный возраст"
@@ -26,6 +26,7 @@ async def main_menu_keyboard() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text=constants.SET_PREFERENCES_BUTTON, callback_data=constants.SET_PREFERENCES_CALL)],
         [InlineKeyboardButton(text=constants.EDIT_PROFILE_BUTTON, callback_data=constants.EDIT_PROFILE_CALL)],
         [InlineKeyboardButton(text=constants.VIEW_RATING_BUTTON, callback_data=constants.VIEW_RATING_CALL)],
+        [InlineKeyboardButton(text=constants.MY_MATCHES_BUTTON, callback_data=constants.MY_MATCHES_CALL)],
     ]
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
@@ -65,3 +66,16 @@ async def back_to_menu_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=constants.BACK_TO_MENU_BUTTON, callback_data=constants.BACK_TO_MENU_CALL)]
     ])
+
+
+async def matches_keyboard(next_cursor: str = None):
+    keyboard = []
+    if next_cursor:
+        keyboard.append([
+            InlineKeyboardButton(
+                text=constants.MATCHES_NEXT_BUTTON,
+                callback_data=f"{constants.MATCHES_PAGE_CALL}:{next_cursor}"
+            )
+        ])
+    keyboard.append([InlineKeyboardButton(text=constants.BACK_TO_MENU_BUTTON, callback_data=constants.BACK_TO_MENU_CALL)])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
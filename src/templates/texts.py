@@ -113,6 +113,9 @@ async def max_rating_saved():
 async def no_profiles_left() -> str:
     return "Анкеты закончились 😔"
 
+async def profile_not_found() -> str:
+    return "Твоя анкета не найдена, пройди регистрацию командой /start"
+
 async def error_dislike() -> str:
     return "Произошла ошибка при сохранении дизлайка"
 
@@ -189,4 +192,17 @@ async def match_notification(username: str = None) -> str:
             "🎉 У вас мэтч!\n"
             "К сожалению, у пользователя не указан username.\n"
             "Мы уведомим его о вашем интересе!"
-        )
\ No newline at end of file
+        )
+
+async def no_matches() -> str:
+    return "У вас пока нет мэтчей. Продолжайте знакомиться! 💫"
+
+async def matches_list(matches: list) -> str:
+    lines = ["💞 Ваши мэтчи:\n"]
+    for match in matches:
+        contact = f"@{match['tg_username']}" if match.get('tg_username') else "username не указан"
+        lines.append(
+            f"• {match['firstname']} {match['lastname']} — {contact} "
+            f"({match['matched_at']:%d.%m.%Y})"
+        )
+    return "\n".join(lines)